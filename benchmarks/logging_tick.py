@@ -0,0 +1,83 @@
+"""Logging benchmark.
+
+Times Scheduler ticks over in-memory schedules with logging at INFO and at
+DEBUG. Records are formatted and written to os.devnull so the cost of
+building the messages is measured without the cost of a real log::
+
+    python benchmarks/logging_tick.py --schedules 10000 --jobs 3
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import time
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+from eventmagic.scheduler import Scheduler
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def tick(count, jobs, level):
+    """Time one tick executing every schedule.
+
+    :param count: The number of schedules
+    :param jobs: The number of jobs in each schedule
+    :param level: The logging level to tick at
+    """
+    logging.getLogger("eventmagic").setLevel(level)
+    now = datetime.datetime.now()
+    schedules = list()
+    for _ in range(count):
+        schedule = Schedule()
+        schedule.jobs = [Event(job) for _ in range(jobs)]
+        schedule.when = "* * * * *"
+        # The crontab sets when to the next minute, fire a minute ago so
+        # every schedule is due
+        schedule._when = now - datetime.timedelta(minutes=1)
+        schedules.append(schedule)
+    scheduler = Scheduler(schedules)
+    started = time.perf_counter()
+    scheduler.tick(now)
+    elapsed = time.perf_counter() - started
+    executed = sum(event.executions for s in schedules for event in s.jobs)
+    assert executed == count * jobs, "only {} of {} jobs ran".format(
+        executed, count * jobs
+    )
+    return elapsed
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--schedules", type=int, default=10000)
+    parser.add_argument("--jobs", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    logger = logging.getLogger("eventmagic")
+    logger.propagate = False
+
+    print("{:,} schedules of {} jobs".format(args.schedules, args.jobs))
+    with open(os.devnull, "w") as devnull:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(name)s %(levelname)s %(message)s"
+        ))
+        logger.addHandler(handler)
+        for name in ("INFO", "DEBUG"):
+            best = min(
+                tick(args.schedules, args.jobs, getattr(logging, name))
+                for _ in range(args.repeat)
+            )
+            print("{:<6} {:>8.3f} s per tick {:>8.1f} us per schedule".format(
+                name, best, best / args.schedules * 1e6
+            ))
+        logger.removeHandler(handler)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Memory benchmark.
+
+Reports the bytes used per Event and per Schedule when holding a large number
+of them in memory, as a long-running process does::
+
+    python benchmarks/memory.py --count 1000000
+"""
+
+import argparse
+import datetime
+import gc
+import resource
+import tracemalloc
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def measure(label, count, create):
+    """Create count objects and print the memory used by each.
+
+    :param label: The name printed for the objects
+    :param count: How many objects to create
+    :param create: A callable returning a new object
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = [create() for _ in range(count)]
+    used, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The list holding them is not part of the objects
+    used -= count * 8
+    print("{:<32} {:>12,} bytes {:>8.1f} bytes each".format(
+        label, used, used / count
+    ))
+    return objects
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1000000)
+    args = parser.parse_args(argv)
+    when = datetime.datetime.now() + datetime.timedelta(days=1)
+
+    print("{:,} objects each".format(args.count))
+    measure("Event", args.count, lambda: Event(job))
+    events = measure(
+        "Event with uuid", args.count, lambda: Event(job, uuid="0" * 32)
+    )
+    del events
+
+    def generated():
+        tmp = Event(job)
+        tmp.uuid
+        return tmp
+
+    measure("Event with generated uuid", args.count, generated)
+
+    def schedule():
+        tmp = Schedule(when=when)
+        tmp.jobs = [Event(job)]
+        return tmp
+
+    measure("Schedule with one Event", args.count, schedule)
+    print("Max RSS {:,} KB".format(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    ))
+
+
+if __name__ == "__main__":
+    main()
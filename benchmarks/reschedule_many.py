@@ -0,0 +1,157 @@
+"""Rescheduling benchmark.
+
+Checks cron.next_fires() against CronTab.next() for randomized expressions,
+then times rescheduling executed schedules one at a time and together with
+cron.reschedule_many()::
+
+    python benchmarks/reschedule_many.py --schedules 50000 --crontabs 5000
+"""
+
+import argparse
+import datetime
+import random
+import time
+from crontab import CronTab
+from eventmagic import cron
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+
+RANGES = {
+    "second": (0, 59), "minute": (0, 59), "hour": (0, 23), "day": (1, 31),
+    "month": (1, 12), "weekday": (0, 7), "year": (2024, 2032),
+}
+NAMES = {
+    "month": ["jan", "feb", "mar", "jun", "dec"],
+    "weekday": ["sun", "mon", "wed", "fri", "sat"],
+}
+
+
+def random_field(rand, field):
+    """Return a random field, any, a value, list, range or step."""
+    low, high = RANGES[field]
+    kind = rand.choice(["*", "*", "value", "list", "range", "step"])
+    if kind == "*":
+        return "*"
+    elif kind == "value":
+        if field in NAMES and rand.random() < 0.3:
+            return rand.choice(NAMES[field])
+        return str(rand.randint(low, high))
+    elif kind == "list":
+        values = rand.sample(range(low, high + 1), rand.randint(2, 4))
+        return ",".join(str(value) for value in sorted(values))
+    start = rand.randint(low, high)
+    end = rand.randint(start, high)
+    # CronTab can not step over years
+    if kind == "range" or field == "year":
+        return "{}-{}".format(start, end)
+    return "{}-{}/{}".format(start, end, rand.randint(1, 10))
+
+
+def random_expression(rand):
+    """Return a random 5, 6 or 7 field crontab expression."""
+    fields = ["minute", "hour", "day", "month", "weekday"]
+    shape = rand.choice([5, 5, 6, 7])
+    if shape > 5:
+        fields.append("year")
+    if shape > 6:
+        fields.insert(0, "second")
+    return " ".join(random_field(rand, field) for field in fields)
+
+
+def random_now(rand):
+    """Return a random naive datetime with microseconds."""
+    start = datetime.datetime(2024, 1, 1)
+    return start + datetime.timedelta(
+        seconds=rand.randint(0, 6 * 365 * 86400),
+        microseconds=rand.randint(0, 999999)
+    )
+
+
+def expected(crontab, now):
+    """Return when CronTab.next() says a crontab next fires."""
+    delay = crontab.next(now=now, default_utc=False)
+    if delay is None:
+        return None
+    return now + datetime.timedelta(seconds=delay)
+
+
+def check(count, seed):
+    """Compare next_fires() to CronTab.next() for random expressions.
+
+    :return: The number of expressions that disagree
+    """
+    rand = random.Random(seed)
+    crontabs = list()
+    for _ in range(count):
+        expression = random_expression(rand)
+        crontabs.append((expression, CronTab(expression)))
+    mismatches = 0
+    # A few nows, each with every expression in one call
+    for _ in range(5):
+        now = random_now(rand)
+        fires = cron.next_fires([crontab for _, crontab in crontabs], now)
+        for (expression, crontab), fire in zip(crontabs, fires):
+            want = expected(crontab, now)
+            if fire != want:
+                mismatches += 1
+                print("MISMATCH {!r} at {}: {} != {}".format(
+                    expression, now, fire, want
+                ))
+    return mismatches
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def executed_schedules(count, crontabs, seed):
+    """Return schedules that have executed and need rescheduling."""
+    rand = random.Random(seed)
+    expressions = [
+        "{} {} * * *".format(rand.randint(0, 59), rand.randint(0, 23))
+        for _ in range(crontabs)
+    ]
+    schedules = list()
+    for _ in range(count):
+        schedule = Schedule(cron=rand.choice(expressions))
+        schedule.jobs = [Event(job)]
+        schedules.append(schedule)
+    return schedules
+
+
+def main(argv=None):
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--expressions", type=int, default=2000)
+    parser.add_argument("--schedules", type=int, default=50000)
+    parser.add_argument("--crontabs", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if cron.numpy is None:
+        print("NumPy is not installed, next_fires() uses CronTab")
+    mismatches = check(args.expressions, args.seed)
+    print("{:,} expressions checked, {} mismatches".format(
+        args.expressions * 5, mismatches
+    ))
+
+    print("{:,} schedules over {:,} crontabs".format(
+        args.schedules, args.crontabs
+    ))
+    schedules = executed_schedules(args.schedules, args.crontabs, args.seed)
+    cron._next_minute_fire.cache_clear()
+    started = time.perf_counter()
+    for schedule in schedules:
+        schedule._reschedule()
+    print("one at a time   {:>8.3f} s".format(time.perf_counter() - started))
+
+    cron._next_minute_fire.cache_clear()
+    started = time.perf_counter()
+    cron.reschedule_many(schedules)
+    print("reschedule_many {:>8.3f} s".format(time.perf_counter() - started))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    exit(main())
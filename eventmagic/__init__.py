@@ -1,12 +1,42 @@
 """Event Magic Package."""
 
+import asyncio
+import datetime
+import functools
 import logging
-import pickle
-import copy
-import mysql.connector
-from . import exceptions
+import os
+import socket
+from . import cron, exceptions, metrics
 from .schedule import Schedule
 from .event import Event
+from .scheduleset import ScheduleSet
+from .cache import ResultCache
+from .storage import StorageBackend
+from .storage.mysql import MySQLBackend, db_connection
+from .storage.sqlite import SQLiteBackend
+from .serialize import (
+    Serialized, BlobCache, BLOB_PREFIX, function_to_bytecode,
+    bytecode_to_function, params_to_bytes, bytes_to_params, register, to_blob,
+    compress
+)
+from .runner import run_forever
+
+__all__ = [
+    "Schedule", "Event", "ScheduleSet", "ResultCache", "StorageBackend",
+    "MySQLBackend", "SQLiteBackend", "db_connection", "Serialized",
+    "BlobCache", "BLOB_PREFIX", "function_to_bytecode", "bytecode_to_function",
+    "params_to_bytes", "bytes_to_params", "register", "to_blob", "compress",
+    "run_forever", "cron", "exceptions", "metrics", "HOST", "PORT", "USERNAME",
+    "PASSWORD", "DATABASE", "POOL_SIZE", "POOL_MAX_AGE", "LOAD_BATCH_SIZE",
+    "SAVE_BATCH_SIZE", "BLOB_STORE", "BLOB_INLINE_SIZE", "COMPRESS_BLOBS",
+    "COMPRESS_MIN_SIZE", "WORKER_ID", "LEASE_SECONDS", "CACHE_OVERLAP",
+    "set_backend", "get_backend", "get_pool", "get_schedules_from_db",
+    "get_events_from_db", "get_event", "update", "save", "save_changes",
+    "query_schedules", "load", "iter_schedules", "load_cached",
+    "invalidate_cache", "load_due", "claim", "release", "run_due",
+    "run_due_async", "remove_schedule", "remove_schedules", "delete_schedules",
+    "remove_event_from_db", "remove_events_from_db"
+]
 
 logger = logging.getLogger(__name__)
 
@@ -16,468 +46,1349 @@ PORT = "3306"
 USERNAME = ""
 PASSWORD = ""
 DATABASE = "eventmagic"
+POOL_SIZE = 5
+POOL_MAX_AGE = 3600
+# Maximum number of ids sent in a single IN (...) look up
+LOAD_BATCH_SIZE = 1000
+# Maximum number of rows sent in a single multi-row INSERT
+SAVE_BATCH_SIZE = 1000
+# Store event functions and params bigger than BLOB_INLINE_SIZE bytes once
+# in the `blobs` table by hash, needs migrations/0004
+BLOB_STORE = False
+BLOB_INLINE_SIZE = 64
+# zlib compress blobs of at least COMPRESS_MIN_SIZE bytes
+COMPRESS_BLOBS = True
+COMPRESS_MIN_SIZE = 256
+# Identifies this process when claiming schedules
+WORKER_ID = "{}:{}".format(socket.gethostname(), os.getpid())
+# Seconds a claimed schedule is leased to a worker
+LEASE_SECONDS = 300
+# Seconds load(cache=True) looks back past its change marks, a row is
+# stamped when written but only seen once committed so a transaction longer
+# than this can still be missed
+CACHE_OVERLAP = 10
+
+# Columns are named so rows keep their shape as the tables gain columns
+SCHEDULE_COLUMNS = "id, `when`, cron, uuid, completed"
+# The `events` columns that can reference a blob
+BLOB_COLUMNS = ("execute_function", "execute_params", "start_function",
+                "start_params", "complete_function", "complete_params")
+EVENT_COLUMNS = "id, execute_function, execute_params, executed, executions, \
+count, start_function, start_params, started, complete_function, \
+complete_params, completed, until_success, uuid"
+
+_backend = None
+_mysql = None
+_mysql_settings = None
 
 
-def db_connection(host, port, username, password, database):
-    """Create a Connection to the DB.
+def set_backend(backend):
+    """Set the process wide storage backend.
 
-    :param host: The Host address for the DB
-    :param port: the Port for the DB conenction to use
-    :param username: the username to connect with
-    :param password: the password to authenticate with
+    :param backend: A StorageBackend, None goes back to MySQL from the
+    module settings
     """
-    logger.debug("Connecting to DB")
-    cnx = mysql.connector.connect(
-        user=username, password=password, host=host,
-        port=port, database=database
-    )
-    return cnx
+    global _backend
+    logger.info("Using storage backend %s", backend)
+    _backend = backend
 
 
-def function_to_bytecode(func):
-    """Save a function.
+def get_backend():
+    """Get the process wide storage backend.
 
-    :param func: The function to save
+    Unless one was set with set_backend() this is MySQL from the module
+    settings, created on first use and kept for the life of the process. If
+    the settings change the old pool is closed and a new backend created.
     """
-    if callable(func):
-        logger.log(5, "Manipulate function to json")
-        code = pickle.dumps(func, protocol=pickle.HIGHEST_PROTOCOL)
-        return code
-    else:
-        logger.log(5, "Not a function")
-        return None
+    global _mysql, _mysql_settings
+    if _backend is not None:
+        return _backend
+    settings = (HOST, PORT, USERNAME, PASSWORD, DATABASE, POOL_SIZE,
+                POOL_MAX_AGE)
+    if _mysql is None or settings != _mysql_settings:
+        if _mysql is not None:
+            logger.info("DB settings changed, replacing connection pool")
+            _mysql.close()
+        logger.debug("Creating connection pool of size %s", POOL_SIZE)
+        _mysql = MySQLBackend(
+            HOST, PORT, USERNAME, PASSWORD, DATABASE,
+            size=POOL_SIZE,
+            max_age=POOL_MAX_AGE
+        )
+        _mysql_settings = settings
+    return _mysql
+
+
+def get_pool():
+    """Get the connection pool of the process wide storage backend."""
+    return get_backend().pool
 
 
-def bytecode_to_function(bytes):
-    """Convert json back to a function.
+def backend_for(pool):
+    """Return the storage backend a pool argument belongs to.
 
-    :param json: the json object to convert back to a python function
+    A backend is used as it is, a plain connection pool is taken to be for
+    the same kind of DB as get_backend().
+
+    :param pool: A StorageBackend, ConnectionPool or None
     """
-    logger.debug(
-        "Converting bytes (type: {}) to function".format(
-            type(bytes)
-        )
-    )
-    if bytes:
-        logger.debug("Creating Function from bytes")
-        func = pickle.loads(bytes)
-        return func
-    else:
-        return None
+    if isinstance(pool, StorageBackend):
+        return pool
+    return get_backend()
+
 
+def event_to_tuple(e, blobs=None):
+    """Convert an event in to a tuple.
 
-def event_to_tuple(e):
-    """Convert an event in to a tuple."""
+    :param e: The event to convert
+    :param blobs: Optional dictionary of hash to bytes, the functions and
+    params are moved in to it and the tuple holds their references
+    """
     if isinstance(e, Event):
-        logger.debug("Job is Event Instance: {}".format(e))
+        logger.debug("Job is Event Instance: %s", e)
+
+        def blob(data):
+            if blobs is None:
+                return data
+            return to_blob(data, blobs, BLOB_INLINE_SIZE)
+
         # By Setting the id field of the tuple to NONE we do not need
         # to name every field when inserting them all
         tmp_tup = (
             None,
-            function_to_bytecode(e.execute_function),
-            pickle.dumps(e.execute_params, protocol=pickle.HIGHEST_PROTOCOL),
+            blob(function_to_bytecode(e.execute_function)),
+            blob(params_to_bytes(e.execute_params)),
             e.executed,
             e.executions,
             e.count,
-            function_to_bytecode(e.start_function),
-            pickle.dumps(e.start_params, protocol=pickle.HIGHEST_PROTOCOL),
+            blob(function_to_bytecode(e.start_function)),
+            blob(params_to_bytes(e.start_params)),
             e.started,
-            function_to_bytecode(e.complete_function),
-            pickle.dumps(e.complete_params, protocol=pickle.HIGHEST_PROTOCOL),
+            blob(function_to_bytecode(e.complete_function)),
+            blob(params_to_bytes(e.complete_params)),
             e.completed,
             e.until_success,
             e.uuid
         )
-        logger.debug("TMP_TUP: {}".format(tmp_tup))
+        logger.debug("TMP_TUP: %s", tmp_tup)
         return tmp_tup
     else:
         raise exceptions.JobIsNotAnEventObject
 
 
-def get_schedules_from_db():
-    """Get Schedules from DB."""
-    schedule_query = "SELECT * FROM `schedules`;"
+def chunks(items, size):
+    """Split a list in to lists of at most size items.
+
+    :param items: The list to split
+    :param size: The maximum length of each chunk
+    """
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def row_to_schedule(row):
+    """Create a Schedule from a `schedules` row.
+
+    :param row: The row as returned by SELECT SCHEDULE_COLUMNS
+    """
+    return Schedule(
+        id=row[0],
+        when=row[1],
+        cron=cron.loads(row[2]),
+        uuid=row[3],
+        completed=row[4]
+    )
+
+
+def row_to_event(row, blobs=None):
+    """Create an Event from an `events` row.
+
+    The functions and params are left as bytes and only unpickled if the
+    event uses them.
+
+    :param row: The row as returned by SELECT EVENT_COLUMNS
+    :param blobs: The BlobCache holding any blobs the row references
+    """
+    field = (blobs or BlobCache()).field
+    return Event(
+        field(row[1], bytecode_to_function),
+        execute_params=field(row[2], bytes_to_params),
+        executed=row[3],
+        executions=row[4],
+        count=row[5],
+        start_function=field(row[6], bytecode_to_function),
+        start_params=field(row[7], bytes_to_params),
+        started=row[8],
+        complete_function=field(row[9], bytecode_to_function),
+        complete_params=field(row[10], bytes_to_params),
+        completed=row[11],
+        until_success=row[12],
+        uuid=row[13],
+        id=row[0]
+    )
+
+
+def blob_digests(values):
+    """Return the hashes of the blobs referenced by column values.
+
+    :param values: An iterable of `events` column values
+    """
+    return {
+        value[len(BLOB_PREFIX):].decode("ascii")
+        for value in values
+        if value and value.startswith(BLOB_PREFIX)
+    }
+
+
+def get_blobs_for_rows(cursor, rows):
+    """Fetch the blobs referenced by `events` rows, each one only once.
+
+    :param cursor: An open cursor to run the queries with
+    :param rows: The rows as returned by SELECT EVENT_COLUMNS
+    :return: A BlobCache of the blobs
+    """
+    digests = blob_digests(
+        value
+        for row in rows
+        for value in (row[1], row[2], row[6], row[7], row[9], row[10])
+    )
+    blobs = dict()
+    for chunk in chunks(list(digests), LOAD_BATCH_SIZE):
+        blobs_query = "SELECT hash, compressed, data FROM `blobs` WHERE \
+hash IN ({});".format(", ".join(["%s"] * len(chunk)))
+        cursor.execute(blobs_query, tuple(chunk))
+        for digest, compressed, data in cursor.fetchall():
+            blobs[digest] = (compressed, data)
+    logger.debug("%s blobs fetched", len(blobs))
+    return BlobCache(blobs)
+
+
+def store_blobs(cursor, blobs, backend=None):
+    """Insert the blobs that are not already stored.
+
+    :param cursor: An open cursor to run the queries with
+    :param blobs: A dictionary of hash to bytes
+    :param backend: The storage backend *default=get_backend()*
+    """
+    backend = backend or get_backend()
+    stored = set()
+    for chunk in chunks(list(blobs), LOAD_BATCH_SIZE):
+        stored_query = "SELECT hash FROM `blobs` WHERE hash IN ({});".format(
+            ", ".join(["%s"] * len(chunk))
+        )
+        cursor.execute(stored_query, tuple(chunk))
+        stored.update(row[0] for row in cursor.fetchall())
+    rows = list()
+    for digest, data in blobs.items():
+        if digest not in stored:
+            compressed = False
+            if COMPRESS_BLOBS:
+                compressed, data = compress(data, COMPRESS_MIN_SIZE)
+            rows.append((digest, compressed, data))
+    # IGNORE as another process may store the same blob at the same time
+    blob_query = backend.insert_ignore_query(
+        "blobs", ("hash", "compressed", "data")
+    )
+    for chunk in chunks(rows, SAVE_BATCH_SIZE):
+        logger.debug("Inserting %s blobs", len(chunk))
+        cursor.executemany(blob_query, chunk)
+
+
+def get_blobs_for_events(cursor, event_ids):
+    """Return the hashes of the blobs referenced by events.
+
+    :param cursor: An open cursor to run the queries with
+    :param event_ids: The ids of the events
+    """
+    digests = set()
+    for chunk in chunks(list(event_ids), LOAD_BATCH_SIZE):
+        cursor.execute("SELECT {} FROM `events` WHERE id IN ({});".format(
+            ", ".join(BLOB_COLUMNS), ", ".join(["%s"] * len(chunk))
+        ), tuple(chunk))
+        digests.update(blob_digests(
+            value for row in cursor.fetchall() for value in row
+        ))
+    return digests
+
+
+def delete_unused_blobs(cursor, digests):
+    """Delete the blobs no event references any more.
+
+    :param cursor: An open cursor to run the queries with
+    :param digests: The hashes of the blobs that may no longer be used,
+    i.e. those of deleted events
+    """
+    for chunk in chunks(sorted(digests), LOAD_BATCH_SIZE):
+        references = tuple(
+            BLOB_PREFIX + digest.encode("ascii") for digest in chunk
+        )
+        marks = ", ".join(["%s"] * len(chunk))
+        cursor.execute("SELECT {} FROM `events` WHERE {};".format(
+            ", ".join(BLOB_COLUMNS), " OR ".join(
+                "{} IN ({})".format(column, marks) for column in BLOB_COLUMNS
+            )
+        ), references * len(BLOB_COLUMNS))
+        used = blob_digests(
+            value for row in cursor.fetchall() for value in row
+        )
+        unused = [digest for digest in chunk if digest not in used]
+        if unused:
+            logger.debug("Removing %s unused blobs", len(unused))
+            cursor.execute(
+                "DELETE FROM `blobs` WHERE hash IN ({});".format(
+                    ", ".join(["%s"] * len(unused))
+                ),
+                tuple(unused)
+            )
+
+
+def get_jobs_for_schedules(cursor, schedules):
+    """Attach the Events to a list of Schedules in a fixed number of queries.
+
+    The `jobs` links and then the `events` are fetched with batched
+    IN (...) look ups of LOAD_BATCH_SIZE ids rather than a query per schedule
+    and per event.
+
+    :param cursor: An open cursor to run the queries with
+    :param schedules: The schedule objects to attach the events to
+    """
+    by_id = {schedule.id: schedule for schedule in schedules}
+    links = list()
+    for chunk in chunks(list(by_id), LOAD_BATCH_SIZE):
+        jobs_query = "SELECT schedule_id, event_id FROM `jobs` WHERE \
+schedule_id IN ({}) ORDER BY schedule_id, event_id;".format(
+            ", ".join(["%s"] * len(chunk))
+        )
+        cursor.execute(jobs_query, tuple(chunk))
+        links.extend(cursor.fetchall())
+    logger.debug("%s jobs found for %s schedules", len(links), len(by_id))
+
+    rows = list()
+    event_ids = list({event_id for schedule_id, event_id in links})
+    for chunk in chunks(event_ids, LOAD_BATCH_SIZE):
+        events_query = "SELECT {} FROM `events` WHERE id IN ({});".format(
+            EVENT_COLUMNS, ", ".join(["%s"] * len(chunk))
+        )
+        cursor.execute(events_query, tuple(chunk))
+        rows.extend(cursor.fetchall())
+    blobs = get_blobs_for_rows(cursor, rows)
+    events = {row[0]: row_to_event(row, blobs) for row in rows}
+
+    jobs = dict()
+    for schedule_id, event_id in links:
+        if event_id in events:
+            jobs.setdefault(schedule_id, list()).append(events[event_id])
+        else:
+            logger.warning("Job references missing event %s", event_id)
+    for schedule_id, schedule in by_id.items():
+        if schedule_id in jobs:
+            schedule.jobs = jobs[schedule_id]
+        else:
+            logger.warning("No Events in schedule %s", schedule_id)
+    return schedules
+
+
+@metrics.persistence
+def get_schedules_from_db(pool=None):
+    """Get Schedules from DB.
+
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    schedule_query = "SELECT {} FROM `schedules`;".format(SCHEDULE_COLUMNS)
     schedules = list()
-    logger.debug("Connecting to server: {}:{} with user {} using DB {}".format(
-        HOST, PORT, USERNAME, DATABASE
-    ))
+    pool = pool or get_backend()
+    logger.debug("Connecting to %s", pool)
     try:
-        conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-    except mysql.connector.Error as e:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            logger.debug("Get the schedules from the DB")
+            logger.debug("executing query: %s", schedule_query)
+            cursor.execute(schedule_query)
+            rows = cursor.fetchall()
+            logger.info("%s Schedules found", cursor.rowcount)
+            cursor.close()
+    except backend_for(pool).errors as e:
         logger.error(
-            "There was a problem connecting to the database: {}".format(e)
+            "There was a problem connecting to the database: %s", e
         )
         raise exceptions.FailedToLoadSchedules(e)
-    cursor = conn.cursor()
-    logger.debug("Get the schedules from the DB")
+    if not rows:
+        logger.warning("No schedules found")
+        raise exceptions.NoSchedulesToLoad
     try:
-        logger.debug("executing query: {}".format(schedule_query))
-        cursor.execute(schedule_query)
-        rows = cursor.fetchall()
-        logger.info("{} Schedules found".format(cursor.rowcount))
-        if not cursor.rowcount:
-            logger.warning("No schedules found")
-            raise exceptions.NoSchedulesToLoad
-        else:
-            logger.debug("Schedules found, Creating schedule objects")
-            for row in rows:
-                # Create a schedule object
-                logger.debug("Creating schedule from row {}".format(row))
-                tmp_sched = Schedule(
-                    id=row[0],
-                    when=row[1],
-                    cron=pickle.loads(row[2]),
-                    uuid=row[3],
-                    completed=row[4]
-                )
-                logger.debug("tmp_sched: {}".format(tmp_sched))
-                logger.debug(
-                    "created temp_sched {} adding to schedules list".format(
-                        tmp_sched.id
-                    )
-                )
-                schedules.append(tmp_sched)
+        logger.debug("Schedules found, Creating schedule objects")
+        for row in rows:
+            # Create a schedule object
+            logger.debug("Creating schedule from row %s", row)
+            tmp_sched = row_to_schedule(row)
+            logger.debug("tmp_sched: %s", tmp_sched)
+            logger.debug(
+                "created temp_sched %s adding to schedules list", tmp_sched.id
+            )
+            schedules.append(tmp_sched)
     except Exception as e:
-        logger.error("Failed to get schedules with error: {}".format(e))
+        logger.error("Failed to get schedules with error: %s", e)
         raise exceptions.FailedToLoadSchedules(e)
-    logger.debug("Returning Schedules from DB: {}".format(schedules))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Returning Schedules from DB: %s", schedules)
     return schedules
 
 
-def get_events_from_db(schedule_id):
+@metrics.persistence
+def get_events_from_db(schedule_id, pool=None):
     """For a given schedule_id get the Events.
 
     :param schedule_id: The schedule id of the schedule in the DB
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
     """
     events_query = "SELECT event_id FROM jobs WHERE schedule_id = %s;"
-    conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-    cursor = conn.cursor()
+    pool = pool or get_backend()
     events = list()
-    logger.debug("Getting Events from DB related to schedule: {}".format(
-        schedule_id
-    ))
+    logger.debug("Getting Events from DB related to schedule: %s", schedule_id)
     try:
-        cursor.execute(events_query, (schedule_id,))
-        rows = cursor.fetchall()
-        if not cursor.rowcount:
+        # Hand the connection back before fetching each event so nested
+        # look ups never wait on a connection held by this function
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(events_query, (schedule_id,))
+            rows = cursor.fetchall()
+            cursor.close()
+        if not rows:
             logger.warning("No Events found")
             raise exceptions.NoEventsToLoad
         else:
             for row in rows:
                 # Create a schedule object
-                logger.debug("Result row is: {}".format(row))
-                events.append(get_event(row[0]))
+                logger.debug("Result row is: %s", row)
+                events.append(get_event(row[0], pool=pool))
     except Exception as e:
         logger.error("Failed to get Events from DB")
         raise exceptions.FailedToLoadEvents(e)
     return events
 
 
-def get_event(event_id):
+@metrics.persistence
+def get_event(event_id, pool=None):
     """Get an Event from the DB by Event ID.
 
     :param event_id: The event to get
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
     """
-    conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-    cursor = conn.cursor()
-    event_query = "SELECT * FROM events WHERE id = %s;"
-    cursor.execute(event_query, (event_id, ))
-    row = cursor.fetchone()
-    if not cursor.rowcount:
+    pool = pool or get_backend()
+    event_query = "SELECT {} FROM events WHERE id = %s;".format(
+        EVENT_COLUMNS
+    )
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(event_query, (event_id, ))
+        row = cursor.fetchone()
+        blobs = get_blobs_for_rows(cursor, [row] if row else [])
+        cursor.close()
+    if not row:
         logger.warning("No Event found")
         raise exceptions.NoEventsToLoad
     else:
-        tmp_event = Event(
-            bytecode_to_function(row[1]),
-            execute_params=pickle.loads(row[2]),
-            executed=row[3],
-            executions=row[4],
-            count=row[5],
-            start_function=bytecode_to_function(row[6]),
-            start_params=pickle.loads(row[7]),
-            started=row[8],
-            complete_function=bytecode_to_function(row[9]),
-            complete_params=pickle.loads(row[10]),
-            completed=row[11],
-            until_success=row[12],
-            uuid=row[13],
-            id=row[0]
+        return row_to_event(row, blobs)
+
+
+def get_ids_by_uuid(cursor, table, uuids):
+    """Look up the DB ids of rows by uuid.
+
+    If a uuid appears more than once the newest row wins.
+
+    :param cursor: An open cursor to run the queries with
+    :param table: The table to look in, `schedules` or `events`
+    :param uuids: The uuids to look up
+    """
+    ids = dict()
+    for chunk in chunks(list(uuids), LOAD_BATCH_SIZE):
+        id_query = "SELECT uuid, MAX(id) FROM `{}` WHERE uuid IN ({}) \
+GROUP BY uuid;".format(table, ", ".join(["%s"] * len(chunk)))
+        cursor.execute(id_query, tuple(chunk))
+        ids.update(cursor.fetchall())
+    return ids
+
+
+def insert_schedules(cursor, schedules):
+    """Insert new Schedules in batches and set their ids.
+
+    :param cursor: An open cursor to run the queries with
+    :param schedules: The schedule objects to insert
+    """
+    schedule_query = "INSERT INTO `schedules` ({}) VALUES(%s, %s, %s, %s, \
+%s);".format(SCHEDULE_COLUMNS)
+    rows = [
+        (
+            None,
+            schedule.when,
+            cron.dumps(schedule.cron),
+            schedule.uuid,
+            schedule.completed
         )
-        return tmp_event
+        for schedule in schedules
+    ]
+    for chunk in chunks(rows, SAVE_BATCH_SIZE):
+        logger.debug("Inserting %s schedules", len(chunk))
+        cursor.executemany(schedule_query, chunk)
+    ids = get_ids_by_uuid(cursor, "schedules", [s.uuid for s in schedules])
+    for schedule in schedules:
+        schedule.id = ids[schedule.uuid]
 
 
-def update(schedule):
-    """Update the Schedule."""
-    logger.debug("Updating schedule rather than creating new")
-    conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-    cursor = conn.cursor()
-    schedule_query = "UPDATE `schedules` SET `when`=%s, completed=%s \
-WHERE id=%s;"
-    schedule_params = (
-        schedule.when,
-        schedule.completed,
-        schedule.id
-    )
-    try:
-        logger.info("Updating schedule {}".format(schedule.uuid))
-        cursor.execute(schedule_query, schedule_params)
-    except Exception as e:
-        logger.error("Updating schedule {} Failed. with error {}".format(
-            schedule.uuid, e
-        ))
-    for job in schedule.jobs:
-        # Test to make sure the job has an ID whcih it should
-        logger.debug("Updating job: {}".format(job))
-        if job.id:
-            event_query = "UPDATE `events` SET executed=%s, executions=%s, \
-count=%s, started=%s, completed=%s where id = %s;"
-            event_params = (
-                job.executed,
-                job.executions,
-                job.count,
-                job.started,
-                job.completed,
-                job.id
-            )
-            try:
-                logger.debug("Updating event")
-                cursor.execute(event_query, event_params)
-            except Exception as e:
-                logger.error("Updating event {} Failed. with error {}".format(
-                    job.uuid, e
-                ))
-        else:
-            raise exceptions.JobHasNoId(
-                "Can't update Job as it has not been saved to the DB before"
+def insert_events(cursor, events, backend=None):
+    """Insert new Events in batches and set their ids.
+
+    :param cursor: An open cursor to run the queries with
+    :param events: The event objects to insert
+    :param backend: The storage backend *default=get_backend()*
+    """
+    event_query = "INSERT INTO `events` ({}) VALUES(%s, %s, %s, %s, %s, %s, \
+%s, %s, %s, %s, %s, %s, %s, %s);".format(EVENT_COLUMNS)
+    blobs = dict() if BLOB_STORE else None
+    rows = [event_to_tuple(event, blobs) for event in events]
+    if blobs:
+        store_blobs(cursor, blobs, backend)
+    for chunk in chunks(rows, SAVE_BATCH_SIZE):
+        logger.debug("Inserting %s events", len(chunk))
+        cursor.executemany(event_query, chunk)
+    ids = get_ids_by_uuid(cursor, "events", [e.uuid for e in events])
+    for event in events:
+        event.id = ids[event.uuid]
+
+
+def insert_jobs(cursor, jobs):
+    """Insert the links between Events and Schedules in batches.
+
+    :param cursor: An open cursor to run the queries with
+    :param jobs: A list of (event_id, schedule_id) tuples
+    """
+    job_query = "INSERT INTO `jobs` VALUES(%s, %s);"
+    for chunk in chunks(jobs, SAVE_BATCH_SIZE):
+        logger.debug("Inserting %s jobs", len(chunk))
+        cursor.executemany(job_query, chunk)
+
+
+def update_changes(cursor, table, changes):
+    """Write changed columns back to existing rows in batches.
+
+    Rows that changed the same set of columns are sent together, one UPDATE
+    per SAVE_BATCH_SIZE rows picks each row's value with CASE id WHEN, so a
+    row deleted since it was loaded is left deleted.
+
+    :param cursor: An open cursor to run the queries with
+    :param table: The table to update
+    :param changes: A list of (id, {column: value}) tuples
+    """
+    groups = dict()
+    for row_id, values in changes:
+        groups.setdefault(tuple(sorted(values)), list()).append(
+            (row_id, values)
+        )
+    for columns, rows in groups.items():
+        for chunk in chunks(rows, SAVE_BATCH_SIZE):
+            cases = "WHEN %s THEN %s " * len(chunk)
+            update_query = "UPDATE `{}` SET {} WHERE id IN ({});".format(
+                table, ", ".join(
+                    "`{}` = CASE id {}END".format(column, cases)
+                    for column in columns
+                ),
+                ", ".join(["%s"] * len(chunk))
             )
-    logger.info("committing changes to DB")
-    conn.commit()
-
-    logger.debug("All Done with Updating schedules, closing connection.")
-    # Now everything has been inserted save the changes
-    # Close the specific query
-    cursor.close()
-    # Close the connection
-    conn.close()
+            params = list()
+            for column in columns:
+                for row_id, values in chunk:
+                    params.extend((row_id, values[column]))
+            params.extend(row_id for row_id, _ in chunk)
+            logger.debug("Updating %s rows in %s", len(chunk), table)
+            cursor.execute(update_query, tuple(params))
+
+
+def changed_fields(schedules):
+    """Snapshot the changed fields of previously saved Schedules and jobs.
+
+    :param schedules: The schedule objects to snapshot
+    :return: A tuple of the schedule and event changes, each a list of
+    (object, {field: value}) tuples
+    """
+    schedule_changes = list()
+    event_changes = list()
+    for schedule in schedules:
+        if schedule.dirty:
+            logger.info("Updating schedule %s", schedule.uuid)
+            schedule_changes.append((schedule, {
+                field: getattr(schedule, field) for field in schedule.dirty
+            }))
+        for job in schedule.jobs:
+            # Test to make sure the job has an ID whcih it should
+            if not job.id:
+                raise exceptions.JobHasNoId(
+                    "Can't update Job as it has not been saved to the DB \
+before"
+                )
+            if job.dirty:
+                logger.debug("Updating job: %s", job)
+                event_changes.append((job, {
+                    field: getattr(job, field) for field in job.dirty
+                }))
+    return schedule_changes, event_changes
+
+
+def write_changes(cursor, changes):
+    """Write the changes snapshotted by changed_fields().
+
+    :param cursor: An open cursor to run the queries with
+    :param changes: The tuple returned by changed_fields()
+    """
+    for table, objects in zip(("schedules", "events"), changes):
+        update_changes(cursor, table, [
+            (obj.id, values) for obj, values in objects
+        ])
+
+
+def update_schedules(cursor, schedules):
+    """Update previously saved Schedules and their jobs in batches.
+
+    Only the fields changed since the schedule or event was loaded or last
+    saved are written, anything unchanged is skipped entirely.
+
+    :param cursor: An open cursor to run the queries with
+    :param schedules: The schedule objects to update
+    """
+    write_changes(cursor, changed_fields(schedules))
+
+
+@metrics.persistence
+def save_changes(changes, pool=None):
+    """Write the changes snapshotted by changed_fields() in one transaction.
+
+    The objects are not marked clean as they may have changed again since
+    the snapshot, see mark_saved().
+
+    :param changes: The tuple returned by changed_fields()
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    pool = pool or get_backend()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            write_changes(cursor, changes)
+        finally:
+            cursor.close()
+        logger.info("committing changes to DB")
+        conn.commit()
     return True
 
 
-def save(schedules):
-    """Save the schedules.
+def mark_saved(changes):
+    """Mark the fields written by save_changes() as saved.
 
-    :param schedules: A list of schedule objects
+    A field that changed again since the snapshot stays dirty.
+
+    :param changes: The tuple returned by changed_fields()
+    """
+    for objects in changes:
+        for obj, values in objects:
+            obj.mark_clean([
+                field for field, value in values.items()
+                if getattr(obj, field) == value
+            ])
+
+
+def mark_clean(schedules):
+    """Mark the Schedules and their jobs as saved.
+
+    :param schedules: The schedule objects that were saved
     """
-    try:
-        conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-    except mysql.connector.Error as e:
-        logger.error(
-            "There was a problem connecting to the database: {}".format(e)
-        )
-        exceptions.FailedToSaveSchedules(e)
-    cursor = conn.cursor()
-    logger.debug("Saving Schedules: {}".format(schedules))
     for schedule in schedules:
-        tmp_jobs = list()
-        logger.info("Saving schedule:")
-        logger.debug("UUID: {} TYPE: {}".format(
-            schedule.uuid, type(schedule.uuid)
-        ))
-        if schedule.id:
-            # Only has an schedule.id if it's been loaded from the DB
-            update(schedule)
-            continue
-        else:
-            schedule_query = "INSERT INTO `schedules` \
-VALUES(%s, %s, %s, %s, %s);"
-            schedule_params = (
-                None,
-                schedule.when,
-                pickle.dumps(schedule.cron, protocol=pickle.HIGHEST_PROTOCOL),
-                schedule.uuid,
-                schedule.completed
-            )
+        schedule.mark_clean()
+        for job in schedule.jobs:
+            job.mark_clean()
+
+
+@metrics.persistence
+def update(schedule, pool=None):
+    """Update the Schedule.
+
+    :param schedule: The schedule object to update
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    logger.debug("Updating schedule rather than creating new")
+    pool = pool or get_backend()
+    with pool.connection() as conn:
+        cursor = conn.cursor()
         try:
-            logger.debug("Saving Schedule")
-            logger.debug("Query: {}, Params: {}".format(
-                schedule_query,
-                schedule_params
-            ))
-            cursor.execute(schedule_query, schedule_params)
-            schedule_id = cursor.lastrowid
-        except Exception as e:
-            logger.error("Failed to save Schedule with error: {}".format(e))
-            logger.info("rolling back save")
+            update_schedules(cursor, [schedule])
+        finally:
             cursor.close()
-            conn.close()
-            return False
+        logger.info("committing changes to DB")
+        conn.commit()
+    mark_clean([schedule])
+    return True
+
+
+def set_lease(cursor, schedules, worker, expires):
+    """Set or clear the lease on Schedules held by a worker.
+
+    :param cursor: An open cursor to run the queries with
+    :param schedules: The schedule objects to change the lease on
+    :param worker: The worker id that holds the lease
+    :param expires: When the lease expires, None releases the lease
+    """
+    ids = [schedule.id for schedule in schedules if schedule.id]
+    for chunk in chunks(ids, LOAD_BATCH_SIZE):
+        lease_query = "UPDATE `schedules` SET lease_owner=%s, \
+lease_expires=%s WHERE lease_owner=%s AND id IN ({});".format(
+            ", ".join(["%s"] * len(chunk))
+        )
+        cursor.execute(
+            lease_query,
+            (worker if expires else None, expires, worker) + tuple(chunk)
+        )
+
+
+@metrics.persistence
+def save(schedules, pool=None, worker=None, renew=0):
+    """Save the schedules.
 
-        logger.debug("Saving Jobs: {}".format(schedule.jobs))
+    New schedules, events and jobs are inserted and the changes to previously
+    saved ones updated with batched statements on one connection, the whole
+    save is committed as a single transaction.
+
+    :param schedules: A list or ScheduleSet of schedule objects, a
+    ScheduleSet indexes the newly saved ones by id
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param worker: The worker id the schedules were claimed by, its lease is
+    released as part of the save
+    :param renew: Seconds to renew the lease for rather than releasing it
+    """
+    pool = pool or get_backend()
+    backend = backend_for(pool)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Saving Schedules: %s", schedules)
+    new_schedules = [schedule for schedule in schedules if not schedule.id]
+    loaded = [schedule for schedule in schedules if schedule.id]
+    # Only has an id if it's been loaded from (or saved to) the DB, an event
+    # shared between schedules is only inserted once
+    new_events = dict()
+    for schedule in schedules:
         for job in schedule.jobs:
-            # Package each job ready for saving
-            logger.debug("Creating Temp job tuple for {}".format(job))
-            logger.debug("Adding Job to tmp_jobs: {}".format(tmp_jobs))
-            try:
-                tmp_jobs.append(event_to_tuple(job))
-            except exceptions.JobIsNotAnEventObject:
+            if not isinstance(job, Event):
                 logger.error("job is not an Event")
-
-        logger.debug("Saving Events: {}".format(tmp_jobs))
-        for row in tmp_jobs:
-            logger.debug("Inserting event: {}".format(row))
-            event_query = "INSERT INTO `events` VALUES(%s, %s, %s, %s, %s, \
-%s, %s, %s, %s, %s, %s, %s, %s, %s);"
-            job_query = "INSERT INTO `jobs` VALUES(%s, %s);"
+            elif not job.id:
+                new_events.setdefault(job.uuid, job)
+    assigned = list()
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
             try:
-                logger.debug("Inserting {} of type {} into events with query \
-{}".format(row, type(row), event_query))
-                cursor.execute(event_query, row)
+                insert_schedules(cursor, new_schedules)
+                assigned.extend(new_schedules)
+                insert_events(cursor, list(new_events.values()), backend)
+                assigned.extend(new_events.values())
+                insert_jobs(cursor, [
+                    (job.id, schedule.id)
+                    for schedule in schedules
+                    for job in schedule.jobs
+                    if isinstance(job, Event) and job.uuid in new_events
+                ])
+                update_schedules(cursor, loaded)
+                if worker:
+                    expires = None
+                    if renew:
+                        expires = datetime.datetime.now() + \
+                            datetime.timedelta(seconds=renew)
+                    set_lease(cursor, loaded, worker, expires)
+                logger.info("committing changes to DB")
+                conn.commit()
             except Exception as e:
                 logger.error(
-                    "Failed to insert event with error: {}".format(e)
+                    "Failed to save Schedules with error: %s", e
                 )
                 logger.warning("rolling back save")
-                cursor.close()
-                conn.close()
+                # Nothing was stored so nothing keeps the ids it was given
+                for obj in assigned:
+                    obj.id = None
                 return False
-            try:
-                # Sets the event_id to the last row inserti id
-                logger.debug("Save the Job")
-                cursor.execute(job_query, (cursor.lastrowid, schedule_id))
-            except Exception as e:
-                logger.error(
-                    "Failed to insert job with error: {}".format(e)
-                )
-                logger.warning("rolling back save")
+            finally:
                 cursor.close()
-                conn.close()
-                return False
-        logger.debug("Schedule Saved")
-        # Commit the result (if it was a data change)
-        logger.info("committing changes to DB")
-        conn.commit()
-
-    logger.debug("All Done with Saving schedules, closing connection.")
-    # Now everything has been inserted save the changes
-    # Close the specific query
-    cursor.close()
-    # Close the connection
-    conn.close()
+    except backend.errors as e:
+        logger.error(
+            "There was a problem connecting to the database: %s", e
+        )
+        raise exceptions.FailedToSaveSchedules(e)
+    mark_clean(schedules)
+    if isinstance(schedules, ScheduleSet):
+        schedules.index_saved()
+    logger.debug("All Done with Saving schedules")
     return True
 
 
-def load():
-    """Load the Schedules from the DB."""
+@metrics.persistence
+def query_schedules(schedule_query, params=(), pool=None, warn_empty=True):
+    """Load the Schedules matching a query with their jobs attached.
+
+    The schedules, jobs and events are read on a single connection in a
+    fixed number of queries and the object graph is built in memory.
+
+    :param schedule_query: A query selecting SCHEDULE_COLUMNS rows
+    :param params: The params for the query
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param warn_empty: Log a warning when no schedules match *default=True*
+    """
+    pool = pool or get_backend()
     try:
-        schedules = get_schedules_from_db()
-    except exceptions.NoSchedulesToLoad:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            logger.debug(
+                "executing query: %s with params: %s", schedule_query, params
+            )
+            cursor.execute(schedule_query, params)
+            schedules = [row_to_schedule(row) for row in cursor.fetchall()]
+            logger.info("%s Schedules found", len(schedules))
+            if schedules:
+                get_jobs_for_schedules(cursor, schedules)
+            cursor.close()
+    except Exception as e:
+        logger.error("Failed to load schedules with error: %s", e)
+        raise exceptions.FailedToLoadSchedules(e)
+    if not schedules and warn_empty:
         logger.warning("No Schedules found")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Returning schedules: %s", schedules)
+    return schedules
 
-    for schedule in schedules:
-        logger.debug("Get the Events / Jobs for the schedule")
-        try:
-            events = get_events_from_db(schedule.id)
-            logger.debug("Adding events ({}) to schedule {} jobs list".format(
-                events, schedule.id
-            ))
-            schedule.jobs = events
-            logger.debug("Schedule jobs is now: {}".format(schedule.jobs))
-        except exceptions.NoEventsToLoad:
-            logger.warning("No Events in schedule")
-        logger.debug("Schedule is: {}".format(schedule))
-        logger.debug("Schedule.id is: {}".format(schedule.id))
-        logger.debug("Schedule.jobs: {}".format(schedule.jobs))
-        logger.debug("EVENT: {}".format(schedule.jobs[0]))
-    logger.debug("Returning schedules: {}".format(schedules))
+
+@metrics.persistence
+def load(pool=None, cache=False):
+    """Load the Schedules from the DB.
+
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param cache: Keep the schedules in memory and on the next load only
+    fetch what changed, see load_cached()
+    """
+    if cache:
+        return load_cached(pool=pool)
+    return query_schedules(
+        "SELECT {} FROM `schedules`;".format(SCHEDULE_COLUMNS), pool=pool
+    )
+
+
+def iter_schedules(batch_size=None, pool=None, after=None):
+    """Load the Schedules a page at a time.
+
+    Pages are read in id order with keyset pagination, each on its own
+    connection, so only one page is held in memory and nothing is held open
+    while a page is processed. Saving a page before asking for the next is
+    safe as pages never overlap::
+
+        for schedules in eventmagic.iter_schedules(500):
+            for schedule in schedules:
+                schedule.execute()
+            eventmagic.save(schedules)
+
+    :param batch_size: The number of schedules in each page
+    *default=LOAD_BATCH_SIZE*
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param after: Only load schedules with an id greater than this
+    :return: A generator of lists of schedules with their jobs attached
+    """
+    page_query = "SELECT {} FROM `schedules` WHERE id > %s ORDER BY id \
+LIMIT %s;".format(SCHEDULE_COLUMNS)
+    batch_size = batch_size or LOAD_BATCH_SIZE
+    after = after or 0
+    first = True
+    while True:
+        # Only the first page being empty means there are no schedules, a
+        # later one just follows a full page that happened to be the last.
+        schedules = query_schedules(
+            page_query, (after, batch_size), pool=pool, warn_empty=first
+        )
+        if not schedules:
+            return
+        first = False
+        after = schedules[-1].id
+        yield schedules
+        if len(schedules) < batch_size:
+            return
+
+
+def overlap(mark):
+    """Return a change mark moved back by CACHE_OVERLAP seconds.
+
+    :param mark: A MAX(updated_at), SQLite returns it as text
+    """
+    if isinstance(mark, str):
+        mark = datetime.datetime.fromisoformat(mark)
+    return mark - datetime.timedelta(seconds=CACHE_OVERLAP)
+
+
+@metrics.persistence
+def load_cached(pool=None):
+    """Load the Schedules, re-using the ones loaded by a previous call.
+
+    One query reads the newest change to `schedules` and `events` and the
+    last deleted schedule. If nothing changed the cached schedules are
+    returned as they are, otherwise only the changed schedules (and any with
+    unsaved changes) are fetched and the deleted ones dropped.
+
+    Rows changed up to CACHE_OVERLAP seconds before the marks are fetched
+    again, and the changes are looked for until the marks have not moved
+    for CACHE_OVERLAP seconds, so a row committed after a newer one is not
+    missed.
+
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    pool = pool or get_backend()
+    marks_query = "SELECT (SELECT MAX(updated_at) FROM `schedules`), \
+(SELECT MAX(updated_at) FROM `events`), \
+(SELECT MAX(id) FROM `deleted_schedules`);"
+    cache = backend_for(pool).cache
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            # Read the marks first so anything changing while loading is
+            # fetched again next time
+            cursor.execute(marks_query)
+            marks = tuple(cursor.fetchone())
+            unsaved = cache.unsaved()
+            if cache.marks is None:
+                logger.info("Schedule cache is cold, loading everything")
+                cursor.execute(
+                    "SELECT {} FROM `schedules`;".format(SCHEDULE_COLUMNS)
+                )
+                schedules = [row_to_schedule(row) for row in cursor.fetchall()]
+                get_jobs_for_schedules(cursor, schedules)
+                cache.replace(schedules)
+            elif marks != cache.marks or unsaved \
+                    or not cache.settled(CACHE_OVERLAP):
+                schedule_mark, event_mark, deleted_mark = cache.marks
+                changed = set(unsaved)
+                if schedule_mark is not None:
+                    cursor.execute(
+                        "SELECT id FROM `schedules` WHERE updated_at >= %s;",
+                        (overlap(schedule_mark),)
+                    )
+                    changed.update(row[0] for row in cursor.fetchall())
+                else:
+                    cursor.execute("SELECT id FROM `schedules`;")
+                    changed.update(row[0] for row in cursor.fetchall())
+                if event_mark is not None:
+                    cursor.execute(
+                        "SELECT DISTINCT jobs.schedule_id FROM `jobs` \
+JOIN `events` ON events.id = jobs.event_id WHERE events.updated_at >= %s;",
+                        (overlap(event_mark),)
+                    )
+                    changed.update(row[0] for row in cursor.fetchall())
+                cursor.execute(
+                    "SELECT schedule_id FROM `deleted_schedules` WHERE id > \
+%s;", (deleted_mark or 0,)
+                )
+                deleted = [row[0] for row in cursor.fetchall()]
+                logger.info(
+                    "%s schedules changed, %s deleted", len(changed),
+                    len(deleted)
+                )
+                schedules = list()
+                for chunk in chunks(sorted(changed), LOAD_BATCH_SIZE):
+                    cursor.execute(
+                        "SELECT {} FROM `schedules` WHERE id IN ({});".format(
+                            SCHEDULE_COLUMNS, ", ".join(["%s"] * len(chunk))
+                        ),
+                        tuple(chunk)
+                    )
+                    schedules.extend(
+                        row_to_schedule(row) for row in cursor.fetchall()
+                    )
+                if schedules:
+                    get_jobs_for_schedules(cursor, schedules)
+                found = {schedule.id for schedule in schedules}
+                # Changed but not found have been deleted since
+                cache.discard(deleted + [i for i in changed if i not in found])
+                cache.merge(schedules)
+            else:
+                logger.debug("Schedule cache is up to date")
+            cache.marks = marks
+            cursor.close()
+    except Exception as e:
+        logger.error("Failed to load schedules with error: %s", e)
+        cache.clear()
+        raise exceptions.FailedToLoadSchedules(e)
+    return cache.schedules
+
+
+def invalidate_cache():
+    """Empty the schedule cache so the next cached load fetches everything."""
+    get_backend().cache.clear()
+
+
+@metrics.persistence
+def load_due(now=None, horizon=0, pool=None, limit=None, after=None):
+    """Load only the Schedules that can fire now.
+
+    Completed schedules and ones due after *now* + *horizon* are filtered out
+    by the DB, the schedules are returned oldest *when* first.
+
+    :param now: The datetime to test against *default=datetime.now()*
+    :param horizon: A timedelta or number of seconds to look ahead so
+    schedules about to fire are included *default=0*
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param limit: The maximum number of schedules to load
+    :param after: A (when, id) tuple, only schedules ordered after it are
+    loaded so a backlog can be paged through
+    """
+    now = now or datetime.datetime.now()
+    if not isinstance(horizon, datetime.timedelta):
+        horizon = datetime.timedelta(seconds=horizon)
+    due_query = "SELECT {} FROM `schedules` WHERE completed = 0 AND \
+`when` <= %s".format(SCHEDULE_COLUMNS)
+    params = (now + horizon,)
+    if after:
+        due_query += " AND (`when` > %s OR (`when` = %s AND id > %s))"
+        params += (after[0], after[0], after[1])
+    due_query += " ORDER BY `when`, id"
+    if limit:
+        due_query += " LIMIT %s"
+        params += (limit,)
+    return query_schedules(due_query + ";", params, pool=pool)
+
+
+@metrics.persistence
+def claim(worker=None, limit=100, lease=None, now=None, pool=None):
+    """Claim a batch of due Schedules for this worker.
+
+    Due schedules that are not leased, or whose lease has expired, are locked
+    (with SELECT ... FOR UPDATE SKIP LOCKED on MySQL) and leased to the worker
+    in one transaction, so concurrent workers never claim the same schedule.
+    Pass the same worker to save() to release or renew the lease.
+
+    :param worker: The id of the claiming worker *default=WORKER_ID*
+    :param limit: The maximum number of schedules to claim *default=100*
+    :param lease: Seconds the schedules are leased for
+    *default=LEASE_SECONDS*
+    :param now: The datetime to test against *default=datetime.now()*
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    worker = worker or WORKER_ID
+    lease = lease or LEASE_SECONDS
+    now = now or datetime.datetime.now()
+    pool = pool or get_backend()
+    backend = backend_for(pool)
+    claim_query = backend.lock_query("SELECT {} FROM `schedules` WHERE \
+completed = 0 AND `when` <= %s AND (lease_expires IS NULL OR lease_expires < \
+%s) ORDER BY `when` LIMIT %s".format(SCHEDULE_COLUMNS))
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            backend.begin(cursor)
+            cursor.execute(claim_query, (now, now, limit))
+            schedules = [row_to_schedule(row) for row in cursor.fetchall()]
+            if schedules:
+                lease_query = "UPDATE `schedules` SET lease_owner=%s, \
+lease_expires=%s WHERE id IN ({});".format(
+                    ", ".join(["%s"] * len(schedules))
+                )
+                cursor.execute(
+                    lease_query,
+                    (worker, now + datetime.timedelta(seconds=lease)) +
+                    tuple(schedule.id for schedule in schedules)
+                )
+                get_jobs_for_schedules(cursor, schedules)
+            conn.commit()
+            cursor.close()
+    except Exception as e:
+        logger.error("Failed to claim schedules with error: %s", e)
+        raise exceptions.FailedToLoadSchedules(e)
+    logger.info("Worker %s claimed %s schedules", worker, len(schedules))
     return schedules
 
 
-def remove_schedule(schedules, schedule_uuid):
+@metrics.persistence
+def release(schedules, worker=None, renew=0, pool=None):
+    """Release or renew the lease on claimed Schedules without saving them.
+
+    :param schedules: The schedule objects that were claimed
+    :param worker: The id of the claiming worker *default=WORKER_ID*
+    :param renew: Seconds to renew the lease for rather than releasing it
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    worker = worker or WORKER_ID
+    pool = pool or get_backend()
+    expires = None
+    if renew:
+        expires = datetime.datetime.now() + datetime.timedelta(seconds=renew)
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        set_lease(cursor, schedules, worker, expires)
+        conn.commit()
+        cursor.close()
+    return True
+
+
+def remaining_seconds(deadline):
+    """Return the seconds left before a deadline.
+
+    :param deadline: A datetime or an AWS Lambda context object
+    """
+    if hasattr(deadline, "get_remaining_time_in_millis"):
+        return deadline.get_remaining_time_in_millis() / 1000.0
+    return (deadline - datetime.datetime.now()).total_seconds()
+
+
+def run_due(deadline=None, batch_size=100, safety_margin=10, pool=None,
+            result_cache=None):
+    """Execute due Schedules in batches until done or out of time.
+
+    Due schedules are loaded oldest *when* first a batch at a time, executed
+    and the batch saved before the next is loaded. A batch is only started if
+    the time left, less the safety margin, covers the longest batch so far,
+    so whatever is left is picked up by the next invocation and nothing that
+    ran is lost or run twice.
+
+    :param deadline: A datetime, or the AWS Lambda context, by which this
+    must return, None runs until nothing is due
+    :param batch_size: The number of schedules loaded and saved at a time
+    *default=100*
+    :param safety_margin: Seconds kept spare before the deadline *default=10*
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param result_cache: Optional ResultCache the jobs share start and
+    complete results through
+    :return: The schedules that were executed
+    """
+    now = datetime.datetime.now()
+    executed = list()
+    after = None
+    longest = 0
+    while True:
+        if deadline is not None:
+            left = remaining_seconds(deadline) - safety_margin
+            if left <= longest:
+                logger.warning(
+                    "%.1f seconds left, stopping with schedules still due",
+                    left + safety_margin
+                )
+                break
+        started = datetime.datetime.now()
+        batch = load_due(now=now, pool=pool, limit=batch_size, after=after)
+        if not batch:
+            logger.info("No more schedules due")
+            break
+        # Page on the when they were loaded with as executing moves it
+        after = (batch[-1].when, batch[-1].id)
+        ran = list()
+        for schedule in batch:
+            try:
+                if schedule.execute(
+                    reschedule=False, result_cache=result_cache
+                ):
+                    ran.append(schedule)
+            except Exception as e:
+                logger.error(
+                    "Schedule %s failed with error: %s", schedule.uuid, e
+                )
+        for schedule, e in cron.reschedule_many(ran):
+            logger.error(
+                "Schedule %s failed with error: %s", schedule.uuid, e
+            )
+        if not save(batch, pool=pool):
+            raise exceptions.FailedToSaveSchedules(
+                "Failed to save batch of {} schedules".format(len(batch))
+            )
+        executed.extend(batch)
+        longest = max(
+            longest, (datetime.datetime.now() - started).total_seconds()
+        )
+        if len(batch) < batch_size:
+            break
+    logger.info("Executed %s schedules", len(executed))
+    return executed
+
+
+async def run_due_async(schedules=None, concurrency=100, pool=None,
+                        result_cache=None):
+    """Execute due Schedules concurrently on the running event loop.
+
+    Coroutine execute, start and complete functions are awaited and other
+    functions run in worker threads. The DB is read and written in a worker
+    thread so the loop is never blocked.
+
+    :param schedules: The schedules to execute *default=load_due()*
+    :param concurrency: The maximum number of jobs running at once across
+    all of the schedules *default=100*
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :param result_cache: Optional ResultCache the jobs share start and
+    complete results through
+    :return: A list with the result of each schedule's execute_async, or the
+    exception it raised
+    """
+    loop = asyncio.get_running_loop()
+    if schedules is None:
+        schedules = await loop.run_in_executor(
+            None, functools.partial(load_due, pool=pool)
+        )
+    limit = asyncio.Semaphore(concurrency)
+    results = await asyncio.gather(
+        *(
+            schedule.execute_async(limit, result_cache)
+            for schedule in schedules
+        ),
+        return_exceptions=True
+    )
+    for schedule, result in zip(schedules, results):
+        if isinstance(result, Exception):
+            logger.error(
+                "Schedule %s failed with error: %s", schedule.uuid, result
+            )
+    await loop.run_in_executor(
+        None, functools.partial(save, schedules, pool=pool)
+    )
+    return results
+
+
+def remove_schedule(schedules, schedule_uuid, pool=None):
     """Remove the Schedule.
 
-    :param schedules: A list of schedules
+    :param schedules: A list or ScheduleSet of schedules
     :param schedule_uuid: The schedule to remove
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
     """
-    if not isinstance(schedules, list):
+    return remove_schedules(schedules, [schedule_uuid], pool=pool)
+
+
+def remove_schedules(schedules, schedule_uuids, pool=None):
+    """Remove Schedules by uuid and delete the saved ones from the DB.
+
+    :param schedules: A list or ScheduleSet of schedules, the schedules are
+    removed from it
+    :param schedule_uuids: The uuids of the schedules to remove
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    :return: The schedules that were removed
+    """
+    if isinstance(schedules, ScheduleSet):
+        removed = schedules.discard(*schedule_uuids)
+    elif isinstance(schedules, list):
+        wanted = set(schedule_uuids)
+        removed = [s for s in schedules if s.uuid in wanted]
+        schedules[:] = [s for s in schedules if s.uuid not in wanted]
+    else:
         msg = "Provide a list of scheduled items"
         logger.error(msg)
         raise exceptions.NoSchedulesProvided(msg)
-    dupe_schedules = copy.deepcopy(schedules)
-    logger.debug("Length of schedule is {} length of dupe is {}".format(
-        len(schedules), len(dupe_schedules)
-    ))
-    logger.debug("Created deep copy of schedules: {} and {}".format(
-        schedules, dupe_schedules
-    ))
-    for schedule in dupe_schedules:
-        logger.debug("Checking Schedule {} for uuid: {}".format(
-            schedule, schedule_uuid
-        ))
-        if schedule.uuid == schedule_uuid:
-            logger.info("Found Schedule in EventMagic")
-            try:
-                schedules.remove(schedule)
-            except ValueError as e:
-                logger.error(
-                    "This should not happen, tried to remove {} from {}\
-".format(
-                        schedule, schedules
-                    )
+    logger.info(
+        "Found %s of %s schedules to remove", len(removed),
+        len(schedule_uuids)
+    )
+    delete_schedules(removed, pool=pool)
+    return removed
+
+
+@metrics.persistence
+def delete_schedules(schedules, pool=None):
+    """Delete saved Schedules and their events from the DB in batches.
+
+    An event is only deleted once no remaining schedule uses it, and a blob
+    once no remaining event does. Everything is deleted in one transaction.
+
+    :param schedules: The schedule objects to delete, unsaved ones are
+    skipped
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    schedule_ids = [schedule.id for schedule in schedules if schedule.id]
+    event_ids = list({
+        job.id
+        for schedule in schedules if schedule.id
+        for job in schedule.jobs if isinstance(job, Event) and job.id
+    })
+    if not schedule_ids:
+        return
+    pool = pool or get_backend()
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            digests = get_blobs_for_events(cursor, event_ids)
+            for chunk in chunks(schedule_ids, LOAD_BATCH_SIZE):
+                logger.info("Removing %s schedules", len(chunk))
+                # The jobs of the schedules are removed by ON DELETE CASCADE
+                cursor.execute(
+                    "DELETE FROM `schedules` WHERE id IN ({});".format(
+                        ", ".join(["%s"] * len(chunk))
+                    ),
+                    tuple(chunk)
                 )
-                logger.debug(
-                    "By catching this error, the schedule can be removed from \
-the database so on the next run it won't run multiple times. If this is an \
-in-memory invocation it should not even have this issue..."
+            for chunk in chunks(event_ids, LOAD_BATCH_SIZE):
+                logger.debug("Removing up to %s events", len(chunk))
+                cursor.execute(
+                    "DELETE FROM `events` WHERE id IN ({}) AND id NOT IN \
+(SELECT event_id FROM `jobs`);".format(", ".join(["%s"] * len(chunk))),
+                    tuple(chunk)
                 )
-                for i in schedules:
-                    logger.debug("Schedule: {}".format(i))
-                    for job in i.jobs:
-                        logger.debug("Jobs: {}".format(job))
-                for di in dupe_schedules:
-                    logger.debug("Dupe Schedule: {}".format(di))
-                    for djob in di.jobs:
-                        logger.debug("Dupe Jobs: {}".format(djob))
-
-            if schedule.id:
-                conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-                cursor = conn.cursor()
-                delete_query = "DELETE FROM `schedules` WHERE id=%s;"
-                delete_params = (schedule.id,)
-                try:
-                    logger.info("Removing schedule id: {}".format(schedule.id))
-                    cursor.execute(delete_query, delete_params)
-                    conn.commit()
-                    logger.debug('Deleted schedule: {}'.format(schedule.id))
-                    # Has an Entry in the DB
-                    for event in schedule.jobs:
-                        if event.id:
-                            # If the event has an id it is also from the db
-                            # NB May not want to do this later if an event is
-                            # used by multiple schedules
-                            logger.debug("Removing Event: {}".format(event.id))
-                            remove_event_from_db(event.id)
-                except Exception as e:
-                    logger.error(
-                        "Deleting Schedule failed with error: {}".format(e)
-                    )
-                    raise exceptions.FailedToDeleteSchedule(e)
+            delete_unused_blobs(cursor, digests)
+            conn.commit()
+            cursor.close()
+    except Exception as e:
+        logger.error(
+            "Deleting Schedule failed with error: %s", e
+        )
+        raise exceptions.FailedToDeleteSchedule(e)
+    logger.debug("Deleted schedules: %s", schedule_ids)
 
 
-def remove_event_from_db(event_id):
+def remove_event_from_db(event_id, pool=None):
     """Remove event from the DB.
 
     :param event_id: The event to remove
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
     """
-    conn = db_connection(HOST, PORT, USERNAME, PASSWORD, DATABASE)
-    cursor = conn.cursor()
-    delete_query = "DELETE FROM `events` WHERE id=%s;"
-    delete_params = (event_id,)
+    remove_events_from_db([event_id], pool=pool)
+
+
+@metrics.persistence
+def remove_events_from_db(event_ids, pool=None):
+    """Remove events from the DB in batches on one connection.
+
+    Blobs no remaining event references are removed with them.
+
+    :param event_ids: The events to remove
+    :param pool: The storage backend or connection pool to use
+    *default=get_backend()*
+    """
+    pool = pool or get_backend()
     try:
-        logger.info("Removing event id: {}".format(event_id))
-        cursor.execute(delete_query, delete_params)
-        conn.commit()
-        logger.debug('Deleted Event: {}'.format(event_id))
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            digests = get_blobs_for_events(cursor, event_ids)
+            for chunk in chunks(list(event_ids), LOAD_BATCH_SIZE):
+                logger.info("Removing %s events", len(chunk))
+                cursor.execute(
+                    "DELETE FROM `events` WHERE id IN ({});".format(
+                        ", ".join(["%s"] * len(chunk))
+                    ),
+                    tuple(chunk)
+                )
+            delete_unused_blobs(cursor, digests)
+            conn.commit()
+            cursor.close()
+        logger.debug('Deleted Events: %s', event_ids)
     except Exception as e:
         logger.error(
-            "Deleting Events failed with error: {}".format(e)
+            "Deleting Events failed with error: %s", e
         )
         raise exceptions.FailedToDeleteEvent(e)
@@ -0,0 +1,306 @@
+"""Cache Module.
+
+Holds the Schedules loaded by a process so a warm invocation (i.e. AWS
+Lambda) only has to fetch what changed in the DB since the last load, and
+the results of start and complete functions shared by many events.
+"""
+
+import asyncio
+import collections
+import logging
+import bisect
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Returned by ResultCache.get when there is no fresh result
+MISSING = object()
+
+# Schedules and events with unsaved changes, held weakly, so a cache finds
+# its changed schedules without looking at every one
+_changed = weakref.WeakSet()
+_changed_lock = threading.Lock()
+
+
+def changed(obj):
+    """Note that a schedule or event has unsaved changes.
+
+    :param obj: The schedule or event
+    """
+    with _changed_lock:
+        _changed.add(obj)
+
+
+def saved(obj):
+    """Note that a schedule or event no longer has unsaved changes.
+
+    :param obj: The schedule or event
+    """
+    with _changed_lock:
+        _changed.discard(obj)
+
+
+def unsaved_objects():
+    """Return the schedules and events with unsaved changes."""
+    with _changed_lock:
+        return list(_changed)
+
+
+class ScheduleCache(object):
+    """ScheduleCache class stores loaded Schedules by DB id."""
+
+    def __init__(self):
+        """Create an empty cache."""
+        self._schedules = dict()
+        # The cached ids in order and the ids of the schedules using each
+        # event, kept up to date as schedules are merged and discarded
+        self._ids = list()
+        self._event_schedules = dict()
+        self._marks = None
+        self._moved_at = None
+
+    def __len__(self):
+        """Return the number of cached schedules."""
+        return len(self._schedules)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SCHEDULES: {}, MARKS: {}".format(
+            len(self._schedules), self._marks
+        )
+
+    @property
+    def marks(self):
+        """Return the change marks the cache is up to date with.
+
+        A tuple of the newest schedule change, newest event change and the
+        last deletion seen, None if nothing has been loaded.
+        """
+        return self._marks
+
+    @marks.setter
+    def marks(self, marks):
+        """Set the change marks, noting when they last moved."""
+        if marks != self._marks:
+            self._moved_at = time.monotonic()
+        self._marks = marks
+
+    def settled(self, seconds):
+        """Test if the change marks have not moved for seconds.
+
+        :param seconds: How long the marks must have stayed the same
+        """
+        return self._moved_at is not None \
+            and time.monotonic() - self._moved_at >= seconds
+
+    @property
+    def schedules(self):
+        """Return the cached schedules in id order."""
+        schedules = self._schedules
+        return [schedules[i] for i in self._ids]
+
+    def unsaved(self):
+        """Return the ids of schedules with changes that were not saved.
+
+        These no longer match the DB so have to be loaded again. Only the
+        changed schedules and events are looked at.
+        """
+        ids = set()
+        for obj in unsaved_objects():
+            if not obj.dirty or obj.id is None:
+                continue
+            if hasattr(obj, "jobs"):
+                if self._schedules.get(obj.id) is obj:
+                    ids.add(obj.id)
+                continue
+            for schedule_id in self._event_schedules.get(obj.id, ()):
+                jobs = self._schedules[schedule_id].jobs
+                if any(job is obj for job in jobs):
+                    ids.add(schedule_id)
+        return sorted(ids)
+
+    def replace(self, schedules):
+        """Replace all of the cached schedules.
+
+        :param schedules: The schedules to cache
+        """
+        self._schedules = dict()
+        self._ids = list()
+        self._event_schedules = dict()
+        self.merge(schedules)
+
+    def merge(self, schedules):
+        """Add or replace schedules.
+
+        :param schedules: The freshly loaded schedules
+        """
+        for schedule in schedules:
+            self.discard([schedule.id])
+            self._schedules[schedule.id] = schedule
+            if not self._ids or schedule.id > self._ids[-1]:
+                self._ids.append(schedule.id)
+            else:
+                bisect.insort(self._ids, schedule.id)
+            for job in schedule.jobs:
+                self._event_schedules.setdefault(job.id, set()).add(
+                    schedule.id
+                )
+
+    def discard(self, schedule_ids):
+        """Remove schedules.
+
+        :param schedule_ids: The DB ids of the schedules to remove
+        """
+        for schedule_id in schedule_ids:
+            schedule = self._schedules.pop(schedule_id, None)
+            if schedule is None:
+                continue
+            del self._ids[bisect.bisect_left(self._ids, schedule_id)]
+            for job in schedule.jobs:
+                using = self._event_schedules.get(job.id)
+                if using is not None:
+                    using.discard(schedule_id)
+                    if not using:
+                        del self._event_schedules[job.id]
+
+    def clear(self):
+        """Empty the cache so the next load fetches everything."""
+        logger.debug("Clearing schedule cache")
+        self._schedules = dict()
+        self._ids = list()
+        self._event_schedules = dict()
+        self._marks = None
+        self._moved_at = None
+
+
+def _freeze(value):
+    """Convert params in to something hashable, keeping their types apart."""
+    if isinstance(value, dict):
+        return dict, frozenset((k, _freeze(v)) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(v) for v in value)
+    elif isinstance(value, (set, frozenset)):
+        return frozenset, frozenset(_freeze(v) for v in value)
+    return value
+
+
+class ResultCache(object):
+    """ResultCache class shares start and complete results between events.
+
+    Results are keyed on the function and its params and kept for ttl
+    seconds, the least recently used are evicted once there are maxsize.
+    Pass one to execute() (or tick, run_due) so events with the same start
+    or complete function and params only call it once while it is fresh.
+    Functions that raise are not cached, nor are unhashable params. An async
+    result is cached as its task so concurrent events share one call, use a
+    cache with one event loop.
+    """
+
+    def __init__(self, ttl=60, maxsize=1024):
+        """Create an empty cache.
+
+        :param ttl: Seconds a result is used for *default=60*
+        :param maxsize: The most results kept *default=1024*
+        """
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._results = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Return the number of cached results."""
+        return len(self._results)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "RESULTS: {}, HITS: {}, MISSES: {}, EVICTIONS: {}".format(
+            len(self._results), self.hits, self.misses, self.evictions
+        )
+
+    def __getstate__(self):
+        """Pickle as an empty cache, i.e. for a ProcessPoolExecutor."""
+        return {"ttl": self._ttl, "maxsize": self._maxsize}
+
+    def __setstate__(self, state):
+        """Unpickle as an empty cache."""
+        self.__init__(**state)
+
+    @staticmethod
+    def _key(function, params):
+        """Return the key for a function and params, None if unhashable."""
+        key = (function, _freeze(params))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, function, params, default=MISSING):
+        """Return the fresh result of a function with params.
+
+        :param function: The start or complete function
+        :param params: The params it is called with
+        :param default: Returned if there is no fresh result *default=MISSING*
+        """
+        key = self._key(function, params)
+        with self._lock:
+            found = self._results.get(key) if key is not None else None
+            if found is not None and found[0] > time.monotonic():
+                self._results.move_to_end(key)
+                self.hits += 1
+                return found[1]
+            if found is not None:
+                del self._results[key]
+            self.misses += 1
+        return default
+
+    def set(self, function, params, result):
+        """Store the result of a function with params.
+
+        :param function: The start or complete function
+        :param params: The params it was called with
+        :param result: What it returned
+        """
+        key = self._key(function, params)
+        if key is None:
+            return
+        with self._lock:
+            self._results[key] = (time.monotonic() + self._ttl, result)
+            self._results.move_to_end(key)
+            while len(self._results) > self._maxsize:
+                self._results.popitem(last=False)
+                self.evictions += 1
+
+    def call(self, function, params, run):
+        """Return the fresh result of a function, calling run if there is none.
+
+        :param function: The start or complete function
+        :param params: The params it is called with
+        :param run: Calls the function with the params
+        """
+        result = self.get(function, params)
+        # A task is what an async start or complete is returning
+        if result is MISSING or isinstance(result, asyncio.Future):
+            result = run()
+            self.set(function, params, result)
+        return result
+
+    def discard(self, function, params):
+        """Drop the result of a function with params.
+
+        :param function: The start or complete function
+        :param params: The params it was called with
+        """
+        key = self._key(function, params)
+        with self._lock:
+            self._results.pop(key, None)
+
+    def clear(self):
+        """Drop every result, the counters are kept."""
+        with self._lock:
+            self._results.clear()
@@ -0,0 +1,301 @@
+"""Cron Module.
+
+Parsed crontabs are interned so every schedule using the same expression
+shares one CronTab, and are stored in the DB as their expression rather than
+pickled. When a crontab next fires is memoized per minute, so rescheduling
+many schedules at the same tick works it out once per expression.
+
+reschedule_many works out the next fire of every expression at once with
+NumPy, when it is installed (pip install eventmagic[numpy]).
+"""
+
+import datetime
+import functools
+import logging
+import pickle
+import threading
+from crontab import CronTab
+from .. import exceptions
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# Interned crontabs by their 7 field expression
+_crontabs = dict()
+_lock = threading.Lock()
+
+# Days ahead next_fires searches, expressions that do not fire within them
+# (i.e. the 29th of February on a Monday) are left to CronTab
+SEARCH_DAYS = 4 * 366
+# Below this many crontabs next_fire() one at a time beats setting up arrays
+VECTOR_MIN_CRONTABS = 8
+_FIRST_YEAR, _LAST_YEAR = 1970, 2099
+
+
+def expression_of(crontab):
+    """Return the 7 field expression of a crontab.
+
+    CronTab does not keep the string it was parsed from, the expression is
+    rebuilt from its fields (i.e. "* * * * *" is "0 * * * * * *").
+
+    :param crontab: The CronTab
+    """
+    return " ".join(matcher.input for matcher in crontab.matchers)
+
+
+def intern(crontab):
+    """Return the shared CronTab with the same expression as a crontab.
+
+    :param crontab: The CronTab
+    """
+    expression = expression_of(crontab)
+    with _lock:
+        return _crontabs.setdefault(expression, crontab)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse(expression):
+    """Return the shared CronTab for an expression.
+
+    :param expression: A crontab string as accepted by CronTab
+    """
+    logger.debug("Parsing crontab %s", expression)
+    return intern(CronTab(expression))
+
+
+def dumps(crontab):
+    """Convert a crontab to the bytes stored in the DB.
+
+    :param crontab: The CronTab or None
+    """
+    if crontab is None:
+        return None
+    return expression_of(crontab).encode("utf-8")
+
+
+def loads(data):
+    """Convert the bytes stored in the DB back to a shared CronTab.
+
+    Rows saved before crontabs were stored as their expression hold a
+    pickled CronTab, these still load.
+
+    :param data: The bytes as read from the DB
+    """
+    if data is None:
+        return None
+    data = bytes(data)
+    if data.startswith(pickle.PROTO):
+        crontab = pickle.loads(data)
+        return None if crontab is None else intern(crontab)
+    return parse(data.decode("utf-8"))
+
+
+@functools.lru_cache(maxsize=4096)
+def _next_minute_fire(crontab, minute):
+    """Return when a crontab firing on the minute next fires after a minute.
+
+    Every time within the minute has the same answer as the crontab only
+    fires at second 0.
+    """
+    delay = crontab.next(now=minute, default_utc=False)
+    if delay is None:
+        return None
+    return minute + datetime.timedelta(seconds=delay)
+
+
+def next_fire(crontab, now=None):
+    """Return the datetime a crontab next fires after now.
+
+    :param crontab: The CronTab
+    :param now: The naive local datetime to start from
+    *default=datetime.now()*
+    :return: The datetime or None if it never fires again
+    """
+    now = now or datetime.datetime.now()
+    if crontab.matchers.second.allowed == {0}:
+        return _next_minute_fire(
+            crontab, now.replace(second=0, microsecond=0)
+        )
+    delay = crontab.next(now=now, default_utc=False)
+    if delay is None:
+        return None
+    return now + datetime.timedelta(seconds=delay)
+
+
+def _vectorizable(crontab):
+    """Test if next_fires can work out when a crontab fires.
+
+    The last day of the month ("L") depends on the date so is left to
+    CronTab.
+    """
+    return not any(
+        item.startswith("l")
+        for matcher in (crontab.matchers.day, crontab.matchers.weekday)
+        for item in matcher.split
+    )
+
+
+def _masks(crontabs, field, size):
+    """Compile a field of each crontab in to a row of allowed values.
+
+    :return: A (crontabs, size) boolean array, True where the value matches
+    """
+    masks = numpy.zeros((len(crontabs), size), dtype=bool)
+    for row, crontab in enumerate(crontabs):
+        matcher = getattr(crontab.matchers, field)
+        if matcher.any:
+            masks[row] = True
+        else:
+            offset = _FIRST_YEAR if field == "year" else 0
+            allowed = [
+                value - offset for value in matcher.allowed
+                if 0 <= value - offset < size
+            ]
+            masks[row, allowed] = True
+    return masks
+
+
+def _next_allowed(masks):
+    """Return the first allowed value at or after each value of the masks.
+
+    :return: A (crontabs, size + 1) int array, size where there is none
+    """
+    size = masks.shape[1]
+    values = numpy.where(masks, numpy.arange(size), size)
+    values = numpy.minimum.accumulate(values[:, ::-1], axis=1)[:, ::-1]
+    return numpy.hstack(
+        (values, numpy.full((len(masks), 1), size, dtype=values.dtype))
+    )
+
+
+def _vector_next_fires(crontabs, now):
+    """Return when each crontab next fires after now using array operations.
+
+    :return: A list of datetimes, None where it is not within SEARCH_DAYS
+    """
+    start = now.replace(microsecond=0) + datetime.timedelta(seconds=1)
+    midnight = datetime.datetime.combine(start.date(), datetime.time())
+
+    # The date parts of every day searched
+    days = numpy.datetime64(start.date(), "D") + numpy.arange(SEARCH_DAYS)
+    months = days.astype("datetime64[M]")
+    day_of_month = (days - months.astype("datetime64[D]")).astype(int) + 1
+    month = months.astype(int) % 12 + 1
+    year = months.astype(int) // 12
+    # 1970-01-01 was a Thursday, CronTab counts Sunday as 0
+    weekday = (days.astype(int) + 4) % 7
+
+    day_ok = _masks(crontabs, "day", 32)[:, day_of_month]\
+        & _masks(crontabs, "month", 13)[:, month]\
+        & _masks(crontabs, "weekday", 7)[:, weekday]
+    in_range = year <= _LAST_YEAR - _FIRST_YEAR
+    day_ok[:, ~in_range] = False
+    day_ok[:, in_range] &= _masks(
+        crontabs, "year", _LAST_YEAR - _FIRST_YEAR + 1
+    )[:, year[in_range]]
+
+    hours = _next_allowed(_masks(crontabs, "hour", 24))
+    minutes = _next_allowed(_masks(crontabs, "minute", 60))
+    seconds = _next_allowed(_masks(crontabs, "second", 60))
+    first = (hours[:, 0], minutes[:, 0], seconds[:, 0])
+
+    # The rest of the first day, this second, this minute or a later hour
+    hour, minute, second = start.hour, start.minute, start.second
+    this_hour = hours[:, hour] == hour
+    this_minute = this_hour & (minutes[:, minute] == minute)\
+        & (seconds[:, second] < 60)
+    later_minute = this_hour & (minutes[:, minute + 1] < 60)
+    later_hour = hours[:, hour + 1] < 24
+    today = numpy.where(
+        this_minute, hour * 3600 + minute * 60 + seconds[:, second],
+        numpy.where(
+            later_minute, hour * 3600 + minutes[:, minute + 1] * 60 + first[2],
+            hours[:, hour + 1] * 3600 + first[1] * 60 + first[2]
+        )
+    )
+    today_ok = day_ok[:, 0] & (this_minute | later_minute | later_hour)
+
+    later_ok = day_ok[:, 1:]
+    later_day = later_ok.argmax(axis=1) + 1
+    found = today_ok | later_ok.any(axis=1)
+    offsets = numpy.where(
+        today_ok, today,
+        later_day * 86400 + first[0] * 3600 + first[1] * 60 + first[2]
+    )
+    # An empty field has no first value
+    found &= (first[0] < 24) & (first[1] < 60) & (first[2] < 60)
+    return [
+        midnight + datetime.timedelta(seconds=int(offset)) if ok else None
+        for offset, ok in zip(offsets.tolist(), found.tolist())
+    ]
+
+
+def next_fires(crontabs, now=None):
+    """Return the datetime each crontab next fires after now.
+
+    With NumPy and at least VECTOR_MIN_CRONTABS crontabs the fields of every
+    crontab are compiled in to masks and the next fires are found together,
+    otherwise (or for a crontab the masks can not express) each is worked out
+    by next_fire().
+
+    :param crontabs: A list of CronTabs
+    :param now: The naive local datetime to start from
+    *default=datetime.now()*
+    :return: A list of datetimes, None where a crontab never fires again
+    """
+    now = now or datetime.datetime.now()
+    fires = [None] * len(crontabs)
+    todo = list(range(len(crontabs)))
+    if numpy is not None and _FIRST_YEAR <= now.year <= _LAST_YEAR:
+        vectorized = [i for i in todo if _vectorizable(crontabs[i])]
+        if len(vectorized) >= VECTOR_MIN_CRONTABS:
+            found = _vector_next_fires([crontabs[i] for i in vectorized], now)
+            for i, fire in zip(vectorized, found):
+                fires[i] = fire
+            todo = [i for i in todo if fires[i] is None]
+    if todo:
+        logger.debug("Working out %s next fires one at a time", len(todo))
+    for i in todo:
+        fires[i] = next_fire(crontabs[i], now)
+    return fires
+
+
+def reschedule_many(schedules, now=None):
+    """Reschedule schedules that have executed, in one pass.
+
+    Does for every schedule what Schedule.execute() does once its jobs have
+    run, the next fire of each distinct crontab is worked out once for all
+    of them. Use with execute(reschedule=False).
+
+    :param schedules: The schedules to reschedule
+    :param now: The naive local datetime to reschedule after
+    *default=datetime.now()*
+    :return: A list of (schedule, exception) for the schedules that could
+    not be rescheduled, these are left as they were
+    """
+    now = now or datetime.datetime.now()
+    schedules = [schedule for schedule in schedules if not schedule.completed]
+    crontabs = dict()
+    for schedule in schedules:
+        if isinstance(schedule.cron, CronTab):
+            crontabs.setdefault(id(schedule.cron), schedule.cron)
+    fires = dict(zip(crontabs, next_fires(list(crontabs.values()), now)))
+
+    def fire(crontab):
+        return fires[id(crontab)]
+
+    failed = list()
+    for schedule in schedules:
+        try:
+            schedule._reschedule(fire)
+        except exceptions.GeneralEventsException as e:
+            failed.append((schedule, e))
+    logger.debug(
+        "Rescheduled %s schedules with %s crontabs, %s failed",
+        len(schedules), len(crontabs), len(failed)
+    )
+    return failed
@@ -3,17 +3,79 @@
 This is where an Event is defined ready to be used.
 """
 
-from .. import exceptions
+from .. import cache, exceptions, metrics
+from ..serialize import Serialized
+import asyncio
+import inspect
 import logging
 import functools
 import uuid as pyuuid
 
 logger = logging.getLogger(__name__)
 
+# The fields that change as an Event runs and are written back on update
+TRACKED_FIELDS = ("executed", "executions", "count", "started", "completed")
+# Shared by everything without changes, every frozenset() is a new object
+NO_CHANGES = frozenset()
+
+
+class FrozenParams(dict):
+    """An immutable params dictionary.
+
+    Events without params share EMPTY_PARAMS rather than each holding their
+    own empty dictionaries. It (and the EMPTY_KWARGS in it) unpickles and
+    copies as the same object, any other params as new FrozenParams.
+    """
+
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("Shared params can not be changed, set new params")
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = \
+        setdefault = update = _immutable
+
+    def __reduce__(self):
+        """Pickle the shared empty params as a reference to them."""
+        if self is EMPTY_PARAMS:
+            return (_empty_params, ())
+        elif self is EMPTY_KWARGS:
+            return (_empty_kwargs, ())
+        return (FrozenParams, (dict(self),))
+
+
+def _empty_params():
+    """Return the shared empty params, used when unpickling them."""
+    return EMPTY_PARAMS
+
+
+def _empty_kwargs():
+    """Return the shared empty kwargs, used when unpickling them."""
+    return EMPTY_KWARGS
+
+
+EMPTY_KWARGS = FrozenParams()
+EMPTY_PARAMS = FrozenParams(args=(), kwargs=EMPTY_KWARGS)
+
+
+def _metric_tags(event, *args, **kwargs):
+    """Return the tags execute() is timed with."""
+    return {
+        "uuid": event.uuid,
+        "function": metrics.name_of(event.execute_function)
+    }
+
 
 class Event(object):
     """The Event class represents a singular Event."""
 
+    __slots__ = (
+        "_execute_function", "_execute_params", "_executed", "_executions",
+        "_count", "_start_function", "_start_params", "_started",
+        "_complete_function", "_complete_params", "_completed",
+        "until_success", "_uuid", "_id", "_dirty", "__weakref__"
+    )
+
     def __init__(self, execute_function, **kwargs):
         """Instantiate the Event Object.
 
@@ -35,26 +97,23 @@ class Event(object):
         :until_success: A Boolean value that ensures an event is re-scheduled
         until it passes successfully
         """
-        self.execute_function = execute_function
-        self.execute_params = kwargs.get(
-            "execute_params", {'args': [], 'kwargs': {}}
-        )
-        self.executed = kwargs.get("executed")
-        self.executions = kwargs.get("executions", 0)
-        self.count = kwargs.get("count", 0)
-        self.start_function = kwargs.get("start_function")
-        self.start_params = kwargs.get(
-            "start_params", {'args': [], 'kwargs': {}}
-        )
-        self.started = kwargs.get("started")
-        self.complete_function = kwargs.get("complete_function")
-        self.complete_params = kwargs.get(
-            "complete_params", {'args': [], 'kwargs': {}}
-        )
-        self.completed = kwargs.get("completed", False)
+        self._execute_function = execute_function
+        self._execute_params = kwargs.get("execute_params", EMPTY_PARAMS)
+        self._executed = kwargs.get("executed")
+        self._executions = kwargs.get("executions", 0)
+        self._count = kwargs.get("count", 0)
+        self._start_function = kwargs.get("start_function")
+        self._start_params = kwargs.get("start_params", EMPTY_PARAMS)
+        self._started = kwargs.get("started")
+        self._complete_function = kwargs.get("complete_function")
+        self._complete_params = kwargs.get("complete_params", EMPTY_PARAMS)
+        self._completed = kwargs.get("completed", False)
         self.until_success = kwargs.get("until_success", False)
-        self.uuid = kwargs.get("uuid", pyuuid.uuid4().hex)
+        # Generated when first asked for
+        self._uuid = kwargs.get("uuid")
         self._id = kwargs.get("id")
+        # Fields changed since the event was created, loaded or saved
+        self._dirty = NO_CHANGES
 
     def __str__(self):
         """Create a printed string."""
@@ -63,22 +122,202 @@ class Event(object):
 \"start_params\": {}, \"started\": {}, \"complete_function\": {}, \
 \"complete_params\": {}, \"completed\": {}, \"until_success\": {}, \
 \"uuid\": {}, \"id\": {}>".format(
-            self.execute_function,
-            self.execute_params,
+            self._execute_function,
+            self._execute_params,
             self.executed,
             self.executions,
             self.count,
-            self.start_function,
-            self.start_params,
+            self._start_function,
+            self._start_params,
             self.started,
-            self.complete_function,
-            self.complete_params,
+            self._complete_function,
+            self._complete_params,
             self.completed,
             self.until_success,
             self.uuid,
             self._id
         )
 
+    def __getstate__(self):
+        """Pickle the slots, generating the uuid first so copies share it."""
+        self.uuid
+        return (None, {
+            slot: getattr(self, slot) for slot in self.__slots__
+            if slot != "__weakref__" and hasattr(self, slot)
+        })
+
+    def _track(self, field, value):
+        """Set a tracked field, recording it as changed if it differs.
+
+        :param field: The name of the field from TRACKED_FIELDS
+        :param value: The new value
+        """
+        if getattr(self, "_" + field) != value:
+            setattr(self, "_" + field, value)
+            if not self._dirty:
+                cache.changed(self)
+            self._dirty |= {field}
+
+    @property
+    def dirty(self):
+        """Return the tracked fields changed since the last save."""
+        return self._dirty
+
+    def mark_clean(self, fields=None):
+        """Forget the changes, i.e. once they have been saved.
+
+        :param fields: Only forget the changes to these fields *default=all*
+        """
+        if fields is None:
+            self._dirty = NO_CHANGES
+        else:
+            self._dirty -= frozenset(fields)
+        if not self._dirty:
+            cache.saved(self)
+
+    def merge(self, other):
+        """Take the tracked fields from a copy of this event.
+
+        Used when the event ran on a copy, i.e. in another process.
+
+        :param other: The copy of the event
+        """
+        for field in TRACKED_FIELDS:
+            setattr(self, field, getattr(other, field))
+
+    def _lazy(self, field):
+        """Return a field, unpickling it the first time it is used.
+
+        :param field: The name of the function or params field
+        """
+        value = getattr(self, "_" + field)
+        if isinstance(value, Serialized):
+            value = value.decode()
+            setattr(self, "_" + field, value)
+        return value
+
+    @property
+    def execute_function(self):
+        """Return the function to execute."""
+        return self._lazy("execute_function")
+
+    @execute_function.setter
+    def execute_function(self, execute_function):
+        """Execute Function Setter."""
+        self._execute_function = execute_function
+
+    @property
+    def execute_params(self):
+        """Return the params for the execute function."""
+        return self._lazy("execute_params")
+
+    @execute_params.setter
+    def execute_params(self, execute_params):
+        """Execute Params Setter."""
+        self._execute_params = execute_params
+
+    @property
+    def start_function(self):
+        """Return the start condition function."""
+        return self._lazy("start_function")
+
+    @start_function.setter
+    def start_function(self, start_function):
+        """Start Function Setter."""
+        self._start_function = start_function
+
+    @property
+    def start_params(self):
+        """Return the params for the start function."""
+        return self._lazy("start_params")
+
+    @start_params.setter
+    def start_params(self, start_params):
+        """Start Params Setter."""
+        self._start_params = start_params
+
+    @property
+    def complete_function(self):
+        """Return the complete condition function."""
+        return self._lazy("complete_function")
+
+    @complete_function.setter
+    def complete_function(self, complete_function):
+        """Complete Function Setter."""
+        self._complete_function = complete_function
+
+    @property
+    def complete_params(self):
+        """Return the params for the complete function."""
+        return self._lazy("complete_params")
+
+    @complete_params.setter
+    def complete_params(self, complete_params):
+        """Complete Params Setter."""
+        self._complete_params = complete_params
+
+    @property
+    def executed(self):
+        """Return if the event has executed."""
+        return self._executed
+
+    @executed.setter
+    def executed(self, executed):
+        """Set whether the event has executed."""
+        self._track("executed", executed)
+
+    @property
+    def executions(self):
+        """Return the number of executions."""
+        return self._executions
+
+    @executions.setter
+    def executions(self, executions):
+        """Set the number of executions."""
+        self._track("executions", executions)
+
+    @property
+    def count(self):
+        """Return how many times to execute the event."""
+        return self._count
+
+    @count.setter
+    def count(self, count):
+        """Set the number of executions to complete after."""
+        self._track("count", count)
+
+    @property
+    def started(self):
+        """Return if the start condition passed."""
+        return self._started
+
+    @started.setter
+    def started(self, started):
+        """Set whether the start condition passed."""
+        self._track("started", started)
+
+    @property
+    def completed(self):
+        """Return if the event has completed."""
+        return self._completed
+
+    @completed.setter
+    def completed(self, completed):
+        """Set whether the event has completed."""
+        self._track("completed", completed)
+
+    @property
+    def uuid(self):
+        """Return the UUID, generating it on first use."""
+        if self._uuid is None:
+            self._uuid = pyuuid.uuid4().hex
+        return self._uuid
+
+    @uuid.setter
+    def uuid(self, uuid):
+        """UUID Setter."""
+        self._uuid = uuid
+
     @property
     def id(self):
         """Return the jobs."""
@@ -87,39 +326,77 @@ class Event(object):
     @id.setter
     def id(self, id):
         """ID Setter."""
-        return self._id
+        self._id = id
 
-    def _run(self, function, params):
-        """For a given function run it with the params.
+    def _partial(self, function, params):
+        """For a given function bind the params to it.
 
-        :param function: The function to run
+        :param function: The function to bind
         :param params: The key word params to pass in
         """
         logger.debug(
-            "Preparing to execute function: {} with params: {}".format(
-                function.__name__, params
-            )
+            "Preparing to execute function: %s with params: %s", function,
+            params
         )
         if isinstance(params, dict):
-            tmp_func = functools.partial(
+            return functools.partial(
                 function, *params['args'], **params['kwargs']
             )
-            return tmp_func()
         else:
             msg = "Params must be a dictionary"
             logger.error(msg)
             raise exceptions.GeneralEventsException(msg)
 
-    def execute(self):
-        """Execute the event."""
-        logger.info("Execute event")
-        logger.debug(
-            "Test to see if between the last execution and the current \
-execution the job has completed"
+    def _run(self, function, params, result_cache=None):
+        """For a given function run it with the params.
+
+        :param function: The function to run
+        :param params: The key word params to pass in
+        :param result_cache: Optional ResultCache to take the result from
+        """
+        if result_cache is None:
+            return self._partial(function, params)()
+        return result_cache.call(
+            function, params, self._partial(function, params)
         )
-        if self.complete_function is not None \
-                and self.complete():
-            self.completed = True
+
+    async def _run_async(self, function, params, result_cache=None):
+        """For a given function await it with the params.
+
+        Coroutine functions are awaited on the running loop, anything else
+        runs in a worker thread so it does not block the loop.
+
+        :param function: The function to run
+        :param params: The key word params to pass in
+        :param result_cache: Optional ResultCache to take the result from
+        """
+        if result_cache is not None:
+            # The task is cached so events awaiting the same function at
+            # the same time share one call
+            task = result_cache.get(function, params)
+            if not isinstance(task, asyncio.Future):
+                task = asyncio.ensure_future(self._run_async(function, params))
+                result_cache.set(function, params, task)
+            try:
+                return await asyncio.shield(task)
+            except Exception:
+                result_cache.discard(function, params)
+                raise
+        tmp_func = self._partial(function, params)
+        if asyncio.iscoroutinefunction(function):
+            return await tmp_func()
+        response = await asyncio.get_running_loop().run_in_executor(
+            None, tmp_func
+        )
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    def _can_run(self):
+        """Test if the event can run once the complete condition is known.
+
+        :return: True if the event should run, False if the count is exceeded
+        """
         if self.completed:
             # This is not necessarily a bad thing. One event may complete
             # While another has not, so not all jobs in a schedule would have
@@ -129,96 +406,247 @@ execution the job has completed"
             raise exceptions.EventAlreadyCompleted
         if self.count == 0 or self.executions < self.count:
             # Count is unset (or unlimited) or executions is less than count
-            logger.debug("Start function is TYPE: {}".format(
-                type(self.start_function)
-            ))
-            if self.start_function is None or self.start():
-                # Fail if start condition is set and returning false
-                if self.execute_function:
-                    try:
-                        response = self._run(
-                            self.execute_function, self.execute_params
-                        )
-                        logger.debug("RESPONSE is: {} of TYPE: {}".format(
-                            response, type(response)
-                        ))
-                        self.executed = True
-                        self.executions += 1
-                    except Exception as e:
-                        logger.error(
-                            "Failed to execute event with error: {}".format(e)
-                        )
-                    if isinstance(response, bool):
-                        if response:
-                            if self.until_success:
-                                self.completed = True
-                    else:
-                        logger.error("Failed to return Boolean value")
-                        raise exceptions.FailedToReturnBooleanValue
-
-                    # Test to see if it should run one more time
-                    if self.complete_function is not None \
-                            and self.complete():
-                        self.completed = True
-                    return response
-                else:
-                    msg = "No Execute function defined"
-                    raise exceptions.GeneralEventsException(msg)
+            logger.debug(
+                "Start function is TYPE: %s", type(self._start_function)
+            )
+            return True
+        logger.debug("Count exceeded")
+        self.completed = True
+        return False
+
+    def _check_response(self, response):
+        """Record the response of the execute function.
+
+        :param response: The value the execute function returned
+        """
+        logger.debug("RESPONSE is: %s of TYPE: %s", response, type(response))
+        if isinstance(response, bool):
+            if response:
+                if self.until_success:
+                    self.completed = True
+        else:
+            logger.error("Failed to return Boolean value")
+            raise exceptions.FailedToReturnBooleanValue
+
+    def _not_started(self):
+        """Log why the event did not start."""
+        if self.start_function is None:
+            logger.debug("No Start function defined")
+        else:
+            logger.warning("Start condition failed")
+
+    @metrics.timed("event.execute", _metric_tags)
+    def execute(self, result_cache=None):
+        """Execute the event.
+
+        :param result_cache: Optional ResultCache shared with other events
+        for the start and complete results
+        """
+        logger.debug("Execute event")
+        logger.debug(
+            "Test to see if between the last execution and the current \
+execution the job has completed"
+        )
+        if self.complete_function is not None \
+                and self.complete(result_cache):
+            self.completed = True
+        if not self._can_run():
+            return
+        if self.start_function is None or self.start(result_cache):
+            # Fail if start condition is set and returning false
+            if self.execute_function:
+                response = None
+                try:
+                    response = self._run(
+                        self.execute_function, self.execute_params
+                    )
+                    self.executed = True
+                    self.executions += 1
+                except Exception as e:
+                    logger.error(
+                        "Failed to execute event with error: %s", e
+                    )
+                self._check_response(response)
+                self._discard_complete(result_cache)
+
+                # Test to see if it should run one more time
+                if self.complete_function is not None \
+                        and self.complete(result_cache):
+                    self.completed = True
+                return response
             else:
-                if self.start_function is None:
-                    logger.info("No Start function defined")
-                else:
-                    logger.warning("Start condition failed")
+                msg = "No Execute function defined"
+                raise exceptions.GeneralEventsException(msg)
         else:
-            logger.info("Count exceeded")
+            self._not_started()
+
+    @metrics.timed("event.execute", _metric_tags)
+    async def execute_async(self, result_cache=None):
+        """Execute the event on the running event loop.
+
+        Behaves as execute() but coroutine functions are awaited and other
+        functions run in a worker thread.
+
+        :param result_cache: Optional ResultCache shared with other events
+        for the start and complete results
+        """
+        logger.debug("Execute event")
+        if self.complete_function is not None \
+                and await self.complete_async(result_cache):
             self.completed = True
+        if not self._can_run():
+            return
+        if self.start_function is None \
+                or await self.start_async(result_cache):
+            if self.execute_function:
+                response = None
+                try:
+                    response = await self._run_async(
+                        self.execute_function, self.execute_params
+                    )
+                    self.executed = True
+                    self.executions += 1
+                except Exception as e:
+                    logger.error(
+                        "Failed to execute event with error: %s", e
+                    )
+                self._check_response(response)
+                self._discard_complete(result_cache)
+
+                # Test to see if it should run one more time
+                if self.complete_function is not None \
+                        and await self.complete_async(result_cache):
+                    self.completed = True
+                return response
+            else:
+                msg = "No Execute function defined"
+                raise exceptions.GeneralEventsException(msg)
+        else:
+            self._not_started()
+
+    def _discard_complete(self, result_cache):
+        """Drop the cached complete result from before the execute ran.
 
-    def start(self):
-        """Execute the start conditional function."""
+        The execute can change what the complete function returns, so the
+        complete test after it is not answered with the stale result.
+
+        :param result_cache: Optional ResultCache shared with other events
+        """
+        if result_cache is not None and self.complete_function is not None:
+            result_cache.discard(self.complete_function, self.complete_params)
+
+    def _start_response(self, response):
+        """Record the response of the start function.
+
+        :param response: The value the start function returned
+        """
+        logger.debug("Start response is %s", response)
+        if response:
+            self.started = True
+            return True
+        else:
+            self.started = False
+            return False
+
+    def start(self, result_cache=None):
+        """Execute the start conditional function.
+
+        :param result_cache: Optional ResultCache to take the result from
+        """
         logger.debug("Run the start condition")
         if self.start_function:
+            response = None
             try:
-                response = self._run(self.start_function, self.start_params)
+                response = self._run(
+                    self.start_function, self.start_params, result_cache
+                )
             except Exception as e:
                 logger.error(
-                    "Error executing complete function: {} with the following \
-error {}".format(
-                        self.start_function.__name__, e
-                    )
+                    "Error executing complete function: %s with the following \
+error %s", self.start_function.__name__, e
                 )
-            logger.debug("Start response is {}".format(response))
-            if response:
-                self.started = True
-                return True
-            else:
-                self.started = False
-                return False
+            return self._start_response(response)
+        else:
+            msg = "No Start function defined"
+            raise exceptions.GeneralEventsException(msg)
+
+    async def start_async(self, result_cache=None):
+        """Await the start conditional function.
+
+        :param result_cache: Optional ResultCache to take the result from
+        """
+        logger.debug("Run the start condition")
+        if self.start_function:
+            response = None
+            try:
+                response = await self._run_async(
+                    self.start_function, self.start_params, result_cache
+                )
+            except Exception as e:
+                logger.error(
+                    "Error executing start function: %s with the following \
+error %s", self.start_function.__name__, e
+                )
+            return self._start_response(response)
         else:
             msg = "No Start function defined"
             raise exceptions.GeneralEventsException(msg)
 
-    def complete(self):
-        """Execute the stop conditional function."""
-        logger.info("Run the complete condition")
+    def _complete_response(self, response):
+        """Record the response of the complete function.
+
+        :param response: The value the complete function returned
+        """
+        logger.debug("Complete response is %s", response)
+        if response:
+            self.completed = True
+            return True
+        else:
+            self.completed = False
+            return False
+
+    def complete(self, result_cache=None):
+        """Execute the stop conditional function.
+
+        :param result_cache: Optional ResultCache to take the result from
+        """
+        logger.debug("Run the complete condition")
         if self.complete_function:
+            response = None
             try:
                 response = self._run(
-                    self.complete_function, self.complete_params
+                    self.complete_function, self.complete_params,
+                    result_cache
                 )
             except Exception as e:
                 logger.error(
-                    "Error executing complete function: {} with the following \
-error {}".format(
-                        self.complete_function.__name__, e
-                    )
+                    "Error executing complete function: %s with the following \
+error %s", self.complete_function.__name__, e
                 )
-            logger.debug("Complete response is {}".format(response))
-            if response:
-                self.completed = True
-                return True
-            else:
-                self.completed = False
-                return False
+            return self._complete_response(response)
+        else:
+            msg = "No Complete function defined"
+            raise exceptions.GeneralEventsException(msg)
+
+    async def complete_async(self, result_cache=None):
+        """Await the stop conditional function.
+
+        :param result_cache: Optional ResultCache to take the result from
+        """
+        logger.debug("Run the complete condition")
+        if self.complete_function:
+            response = None
+            try:
+                response = await self._run_async(
+                    self.complete_function, self.complete_params,
+                    result_cache
+                )
+            except Exception as e:
+                logger.error(
+                    "Error executing complete function: %s with the following \
+error %s", self.complete_function.__name__, e
+                )
+            return self._complete_response(response)
         else:
             msg = "No Complete function defined"
             raise exceptions.GeneralEventsException(msg)
@@ -117,3 +117,21 @@ class FailedToLoadEvents(Exception):
     """Exception class for failure to laod Events."""
 
     pass
+
+
+class PoolExhausted(Exception):
+    """Exception class for when no pooled connection becomes available."""
+
+    pass
+
+
+class FunctionNotFound(Exception):
+    """Exception class for a function reference that can not be resolved."""
+
+    pass
+
+
+class StorageNotAvailable(Exception):
+    """Exception class for a storage backend whose driver is not installed."""
+
+    pass
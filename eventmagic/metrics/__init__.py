@@ -0,0 +1,363 @@
+"""Metrics Module.
+
+Times events, schedules, ticks and the persistence functions, counts the
+queries each persistence function issues and records how late schedules
+fire. Nothing is measured until a sink is enabled::
+
+    sink = eventmagic.metrics.MemorySink()
+    eventmagic.metrics.enable(sink)
+
+While disabled each instrumented call costs one test of the module sink.
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Where measurements go, None when disabled
+_sink = None
+# The outermost persistence function running, queries are counted against it
+_operation = contextvars.ContextVar("eventmagic_operation", default=None)
+
+
+def enable(sink):
+    """Send measurements to a sink.
+
+    :param sink: A MemorySink, StatsDSink, CallbackSink or anything with a
+    record(kind, name, value, tags) method
+    """
+    global _sink
+    logger.info("Sending metrics to %s", sink)
+    _sink = sink
+
+
+def disable():
+    """Stop measuring."""
+    global _sink
+    _sink = None
+
+
+def enabled():
+    """Test if measurements are being recorded."""
+    return _sink is not None
+
+
+def timing(name, seconds, **tags):
+    """Record how long something took.
+
+    :param name: The metric name, i.e. "event.execute"
+    :param seconds: The duration
+    :param tags: Optional tags, i.e. uuid="..."
+    """
+    sink = _sink
+    if sink is not None:
+        sink.record("timing", name, seconds, tags)
+
+
+def count(name, value=1, **tags):
+    """Record how many times something happened.
+
+    :param name: The metric name, i.e. "query"
+    :param value: The number to add *default=1*
+    :param tags: Optional tags, i.e. function="save"
+    """
+    sink = _sink
+    if sink is not None:
+        sink.record("count", name, value, tags)
+
+
+def name_of(function):
+    """Return a function's name for a tag."""
+    return getattr(function, "__name__", type(function).__name__)
+
+
+def timed(name, tags=None):
+    """Time a function or coroutine function while metrics are enabled.
+
+    :param name: The metric name
+    :param tags: Optional callable given the call's arguments returning the
+    tags, it is only called while enabled
+    """
+    def decorator(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_async(*args, **kwargs):
+                if _sink is None:
+                    return await function(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    timing(
+                        name, time.perf_counter() - started,
+                        **(tags(*args, **kwargs) if tags else {})
+                    )
+            return timed_async
+
+        @functools.wraps(function)
+        def timed_call(*args, **kwargs):
+            if _sink is None:
+                return function(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timing(
+                    name, time.perf_counter() - started,
+                    **(tags(*args, **kwargs) if tags else {})
+                )
+        return timed_call
+    return decorator
+
+
+def persistence(function):
+    """Time a persistence function and count the queries it issues.
+
+    Queries made by a persistence function called from another are counted
+    against the outermost one, i.e. load rather than query_schedules.
+    """
+    @functools.wraps(function)
+    def measured(*args, **kwargs):
+        if _sink is None:
+            return function(*args, **kwargs)
+        token = None
+        if _operation.get() is None:
+            token = _operation.set(function.__name__)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timing(
+                "persistence", time.perf_counter() - started,
+                function=function.__name__
+            )
+            if token is not None:
+                _operation.reset(token)
+    return measured
+
+
+def connection(conn):
+    """Return a connection whose queries are measured while enabled.
+
+    :param conn: The DB connection
+    """
+    if _sink is None:
+        return conn
+    return _MeasuredConnection(conn)
+
+
+class _MeasuredConnection(object):
+    """A connection whose cursors time their queries."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _MeasuredCursor(self._conn.cursor(*args, **kwargs))
+
+
+class _MeasuredCursor(object):
+    """A cursor timing and counting its queries."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _measure(self, method, *args):
+        operation = _operation.get() or "other"
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            timing(
+                "query", time.perf_counter() - started, function=operation
+            )
+            count("query", function=operation)
+
+    def execute(self, *args):
+        return self._measure(self._cursor.execute, *args)
+
+    def executemany(self, *args):
+        return self._measure(self._cursor.executemany, *args)
+
+
+class Histogram(object):
+    """Histogram class aggregates timings in to buckets."""
+
+    # Upper bounds of the buckets in seconds, the last is everything slower
+    BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, float("inf"))
+
+    def __init__(self):
+        """Create an empty histogram."""
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.buckets = [0] * len(self.BOUNDS)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "COUNT: {}, MEAN: {}, MIN: {}, MAX: {}".format(
+            self.count, self.mean, self.min, self.max
+        )
+
+    @property
+    def mean(self):
+        """Return the mean, None if empty."""
+        return self.total / self.count if self.count else None
+
+    def add(self, value):
+        """Add a timing.
+
+        :param value: The duration in seconds
+        """
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.BOUNDS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+
+def _key(name, tags):
+    """Return the key of a metric and its tags."""
+    return name, tuple(sorted(tags.items()))
+
+
+class MemorySink(object):
+    """MemorySink class aggregates measurements in the process."""
+
+    def __init__(self):
+        """Create an empty sink."""
+        self._lock = threading.Lock()
+        self.timings = dict()
+        self.counts = dict()
+
+    def __str__(self):
+        """Create a printed string."""
+        return "MemorySink: {} timings, {} counts".format(
+            len(self.timings), len(self.counts)
+        )
+
+    def record(self, kind, name, value, tags):
+        """Add a measurement.
+
+        :param kind: "timing" or "count"
+        :param name: The metric name
+        :param value: Seconds for a timing, the number to add for a count
+        :param tags: A dictionary of tags
+        """
+        key = _key(name, tags)
+        with self._lock:
+            if kind == "timing":
+                histogram = self.timings.get(key)
+                if histogram is None:
+                    histogram = self.timings[key] = Histogram()
+                histogram.add(value)
+            else:
+                self.counts[key] = self.counts.get(key, 0) + value
+
+    def histogram(self, name, **tags):
+        """Return the Histogram of a timing, None if never recorded.
+
+        :param name: The metric name
+        :param tags: The exact tags it was recorded with
+        """
+        return self.timings.get(_key(name, tags))
+
+    def count(self, name, **tags):
+        """Return a count, 0 if never recorded.
+
+        :param name: The metric name
+        :param tags: The exact tags it was recorded with
+        """
+        return self.counts.get(_key(name, tags), 0)
+
+    def clear(self):
+        """Drop everything recorded."""
+        with self._lock:
+            self.timings = dict()
+            self.counts = dict()
+
+
+class StatsDSink(object):
+    """StatsDSink class sends measurements over UDP in the StatsD format.
+
+    Timings are sent in milliseconds, tags use the DogStatsD "|#" extension
+    which plain StatsD ignores.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8125, prefix="eventmagic"):
+        """Create the sink.
+
+        :param host: The StatsD host *default=127.0.0.1*
+        :param port: The StatsD port *default=8125*
+        :param prefix: Put before every metric name *default=eventmagic*
+        """
+        self._address = (host, port)
+        self._prefix = prefix + "." if prefix else ""
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "StatsDSink: {}:{}".format(*self._address)
+
+    def format(self, kind, name, value, tags):
+        """Return the StatsD line for a measurement."""
+        if kind == "timing":
+            line = "{}{}:{:.3f}|ms".format(self._prefix, name, value * 1000)
+        else:
+            line = "{}{}:{}|c".format(self._prefix, name, value)
+        if tags:
+            line += "|#" + ",".join(
+                "{}:{}".format(k, v) for k, v in sorted(tags.items())
+            )
+        return line
+
+    def record(self, kind, name, value, tags):
+        """Send a measurement, it is dropped if it can not be sent."""
+        try:
+            self._socket.sendto(
+                self.format(kind, name, value, tags).encode("utf-8"),
+                self._address
+            )
+        except OSError as e:
+            logger.debug("Failed to send metric %s: %s", name, e)
+
+    def close(self):
+        """Close the socket."""
+        self._socket.close()
+
+
+class CallbackSink(object):
+    """CallbackSink class passes every measurement to a function."""
+
+    def __init__(self, callback):
+        """Create the sink.
+
+        :param callback: Called with (kind, name, value, tags) where kind is
+        "timing" (value in seconds) or "count"
+        """
+        self._callback = callback
+
+    def __str__(self):
+        """Create a printed string."""
+        return "CallbackSink: {}".format(name_of(self._callback))
+
+    def record(self, kind, name, value, tags):
+        """Pass a measurement to the callback."""
+        self._callback(kind, name, value, tags)
@@ -0,0 +1,159 @@
+"""Connection Pool Module.
+
+A process wide pool of DB connections. As the pool lives at module level it
+survives between warm invocations of a short-lived process (i.e. AWS Lambda)
+so connections are re-used rather than created for every query.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from .. import exceptions, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool(object):
+    """A fixed size pool of health checked DB connections."""
+
+    def __init__(self, connect, **kwargs):
+        """Create the pool.
+
+        Connections are created lazily, the pool never holds more than *size*
+        connections at any one time.
+
+        :param connect: A callable that returns a new DB connection
+        :param size: The maximum number of connections *default=5*
+        :param max_age: Seconds before a connection is replaced regardless of
+        health, 0 disables *default=3600*
+        :param timeout: Seconds to wait for a free connection before raising
+        PoolExhausted *default=30*
+        :param check: A callable given a connection that returns True if the
+        connection is still usable *default=connection.is_connected()*
+        """
+        self._connect = connect
+        self._size = kwargs.get("size", 5)
+        self._max_age = kwargs.get("max_age", 3600)
+        self._timeout = kwargs.get("timeout", 30)
+        self._check = kwargs.get("check", lambda conn: conn.is_connected())
+        # Idle connections as (connection, created) most recently used last
+        self._idle = []
+        self._created = 0
+        self._lock = threading.Condition()
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SIZE: {}, CREATED: {}, IDLE: {}".format(
+            self._size, self._created, len(self._idle)
+        )
+
+    @property
+    def size(self):
+        """Return the maximum number of connections."""
+        return self._size
+
+    def _new(self):
+        """Create a new connection."""
+        logger.debug("Creating new pooled connection")
+        return (self._connect(), time.monotonic())
+
+    def _discard(self, conn):
+        """Close a connection that is no longer wanted."""
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug("Closing stale connection failed with: %s", e)
+
+    def _healthy(self, conn, created):
+        """Test if a connection can be handed out."""
+        if self._max_age and time.monotonic() - created > self._max_age:
+            logger.debug("Pooled connection exceeded max age")
+            return False
+        try:
+            return bool(self._check(conn))
+        except Exception as e:
+            logger.warning("Pooled connection failed health check: %s", e)
+            return False
+
+    def acquire(self):
+        """Check a connection out of the pool.
+
+        :return: a tuple of the connection and the time it was created
+        """
+        deadline = time.monotonic() + self._timeout
+        with self._lock:
+            while not self._idle and self._created >= self._size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    msg = "No connection available after {} seconds".format(
+                        self._timeout
+                    )
+                    logger.error(msg)
+                    raise exceptions.PoolExhausted(msg)
+                self._lock.wait(remaining)
+            if self._idle:
+                conn, created = self._idle.pop()
+            else:
+                # Reserve the slot before connecting outside of the lock
+                self._created += 1
+                conn = None
+        if conn is not None:
+            if self._healthy(conn, created):
+                return conn, created
+            self._discard(conn)
+            logger.info("Replacing stale pooled connection")
+        try:
+            return self._new()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn, created, discard=False):
+        """Return a connection to the pool.
+
+        :param conn: The connection to return
+        :param created: When the connection was created
+        :param discard: Close the connection rather than re-use it
+        """
+        if discard:
+            self._discard(conn)
+        with self._lock:
+            if discard:
+                self._created -= 1
+            else:
+                self._idle.append((conn, created))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with block.
+
+        Anything not committed when the block exits is rolled back, if that
+        fails the connection is thrown away rather than returned. Queries are
+        measured while metrics are enabled.
+        """
+        conn, created = self.acquire()
+        discard = False
+        try:
+            yield metrics.connection(conn)
+        finally:
+            try:
+                conn.rollback()
+            except Exception as e:
+                logger.warning(
+                    "Rollback failed, discarding connection: %s", e
+                )
+                discard = True
+            self.release(conn, created, discard)
+
+    def close(self):
+        """Close every idle connection in the pool."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+            self._lock.notify_all()
+        for conn, created in idle:
+            self._discard(conn)
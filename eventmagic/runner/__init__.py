@@ -0,0 +1,245 @@
+"""Runner Module.
+
+A long-running process that keeps the schedules in memory and sleeps until
+the next one is due, rather than loading everything on a fixed interval.
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import signal
+import threading
+import eventmagic
+from ..scheduler import Scheduler, TimerWheel
+
+logger = logging.getLogger(__name__)
+
+
+class Runner(object):
+    """Runner class executes schedules as they become due."""
+
+    def __init__(self, schedules=None, **kwargs):
+        """Create the runner.
+
+        :param schedules: The schedules to run *default=eventmagic.load()*
+        :param save_interval: Seconds between background saves of the
+        executed schedules *default=5*
+        :param reload_interval: Seconds between reloading the schedules from
+        the DB to pick up new ones, None never reloads *default=None*
+        :param pool: The storage backend or connection pool to use
+        *default=get_backend()*
+        :param scheduler: The class ordering the schedules, i.e. TimerWheel
+        *default=Scheduler*
+        """
+        self._schedules = schedules
+        self._save_interval = kwargs.get("save_interval", 5)
+        self._reload_interval = kwargs.get("reload_interval")
+        self._pool = kwargs.get("pool")
+        self._scheduler_class = kwargs.get("scheduler", Scheduler)
+        self._scheduler = self._scheduler_class()
+        # Held while executing or snapshotting the changes so a schedule is
+        # never saved while its jobs are running
+        self._lock = threading.Lock()
+        # Held for a whole save so two saves never write out of order
+        self._flushing = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._pending = dict()
+        self._saver = None
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SCHEDULER: {}, PENDING SAVE: {}".format(
+            self._scheduler, len(self._pending)
+        )
+
+    @property
+    def scheduler(self):
+        """Return the scheduler."""
+        return self._scheduler
+
+    def add(self, schedule):
+        """Add a schedule while the runner is running.
+
+        :param schedule: The schedule to add
+        """
+        with self._lock:
+            self._scheduler.add(schedule)
+            self._pending[schedule.uuid] = schedule
+        self._wake.set()
+
+    def stop(self):
+        """Stop the runner once the current tick has finished."""
+        logger.info("Stopping runner")
+        self._stop.set()
+        self._wake.set()
+
+    def _load(self):
+        """Load the schedules in to the scheduler."""
+        schedules = self._schedules
+        self._schedules = None
+        if schedules is None:
+            schedules = eventmagic.load(pool=self._pool)
+        with self._lock:
+            self._scheduler = self._scheduler_class(schedules)
+        logger.info("Loaded %s schedules", len(self._scheduler))
+
+    def _flush(self):
+        """Save the executed schedules.
+
+        The changes are snapshotted under the lock and written outside it so
+        ticks are not held up by the DB. New schedules and jobs are inserted
+        under the lock as they are given their ids. If the save fails they
+        are kept so the next save tries again.
+        """
+        with self._flushing:
+            with self._lock:
+                if not self._pending:
+                    return
+                pending = self._pending
+                self._pending = dict()
+                new = list()
+                loaded = list()
+                for schedule in pending.values():
+                    if schedule.id and all(job.id for job in schedule.jobs):
+                        loaded.append(schedule)
+                    else:
+                        new.append(schedule)
+                changes = eventmagic.changed_fields(loaded)
+                saved = self._save(eventmagic.save, new) if new else True
+            if saved:
+                saved = self._save(eventmagic.save_changes, changes)
+            with self._lock:
+                if not saved:
+                    pending.update(self._pending)
+                    self._pending = pending
+                    return
+                eventmagic.mark_saved(changes)
+        logger.debug("Saved %s schedules", len(pending))
+
+    def _save(self, save, saving):
+        """Save with eventmagic.save or save_changes, logging any failure.
+
+        :return: True if saved
+        """
+        try:
+            return save(saving, pool=self._pool)
+        except Exception as e:
+            logger.error("Saving schedules failed with: %s", e)
+            return False
+
+    def _save_forever(self):
+        """Save the executed schedules every save_interval until stopped."""
+        while not self._stop.wait(self._save_interval):
+            self._flush()
+
+    def _sleep_for(self, reload_at):
+        """Work out how long to sleep before the next schedule is due.
+
+        :param reload_at: When the schedules should next be reloaded or None
+        :return: Seconds to sleep, None to sleep until woken
+        """
+        with self._lock:
+            wake_at = self._scheduler.next_due()
+        if reload_at and (wake_at is None or reload_at < wake_at):
+            wake_at = reload_at
+        if wake_at is None:
+            return None
+        return max(0, (wake_at - datetime.datetime.now()).total_seconds())
+
+    def run(self):
+        """Execute schedules as they become due until stopped."""
+        self._load()
+        self._saver = threading.Thread(
+            target=self._save_forever, name="eventmagic-saver", daemon=True
+        )
+        self._saver.start()
+        reload_at = None
+        if self._reload_interval:
+            reload_at = datetime.datetime.now() + datetime.timedelta(
+                seconds=self._reload_interval
+            )
+        try:
+            while not self._stop.is_set():
+                if reload_at and reload_at <= datetime.datetime.now():
+                    self._flush()
+                    self._load()
+                    reload_at = datetime.datetime.now() + \
+                        datetime.timedelta(seconds=self._reload_interval)
+                with self._lock:
+                    for schedule in self._scheduler.tick():
+                        self._pending[schedule.uuid] = schedule
+                timeout = self._sleep_for(reload_at)
+                logger.debug("Sleeping for %s seconds", timeout)
+                self._wake.wait(timeout)
+                self._wake.clear()
+        finally:
+            self._stop.set()
+            self._saver.join()
+            self._flush()
+            logger.info("Runner stopped")
+
+
+def run_forever(schedules=None, **kwargs):
+    """Run schedules in a long-running process until SIGTERM or SIGINT.
+
+    The schedules are kept in memory and the process sleeps until the next
+    one is due, the executed schedules are saved in the background. See
+    Runner for the options.
+
+    :param schedules: The schedules to run *default=eventmagic.load()*
+    """
+    runner = Runner(schedules, **kwargs)
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: runner.stop())
+    runner.run()
+    return runner
+
+
+def main(argv=None):
+    """Console entry point for run_forever."""
+    parser = argparse.ArgumentParser(
+        description="Run eventmagic schedules in a long-running process"
+    )
+    parser.add_argument("--host", default=os.environ.get("EVENTMAGIC_HOST"))
+    parser.add_argument(
+        "--port", default=os.environ.get("EVENTMAGIC_PORT", eventmagic.PORT)
+    )
+    parser.add_argument(
+        "--username", default=os.environ.get("EVENTMAGIC_USERNAME")
+    )
+    parser.add_argument(
+        "--database",
+        default=os.environ.get("EVENTMAGIC_DATABASE", eventmagic.DATABASE)
+    )
+    parser.add_argument(
+        "--sqlite", default=os.environ.get("EVENTMAGIC_SQLITE"),
+        help="Store the schedules in this SQLite file rather than MySQL"
+    )
+    parser.add_argument("--save-interval", type=float, default=5)
+    parser.add_argument("--reload-interval", type=float, default=None)
+    parser.add_argument(
+        "--timer-wheel", action="store_true",
+        help="Bucket the schedules by minute rather than keep them in a heap"
+    )
+    parser.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper())
+    eventmagic.HOST = args.host or eventmagic.HOST
+    eventmagic.PORT = args.port
+    eventmagic.USERNAME = args.username or eventmagic.USERNAME
+    # Only read from the environment so it is not visible in the process list
+    eventmagic.PASSWORD = os.environ.get(
+        "EVENTMAGIC_PASSWORD", eventmagic.PASSWORD
+    )
+    eventmagic.DATABASE = args.database
+    if args.sqlite:
+        eventmagic.set_backend(eventmagic.SQLiteBackend(args.sqlite))
+    run_forever(
+        save_interval=args.save_interval,
+        reload_interval=args.reload_interval,
+        scheduler=TimerWheel if args.timer_wheel else Scheduler
+    )
@@ -1,41 +1,172 @@
 """Schedule Module."""
 
+import asyncio
+import functools
 import logging
 import datetime
+import threading
+from concurrent.futures import Executor
 import uuid as pyuuid
 from .. import exceptions
 from crontab import CronTab
-from ..event import Event
+from .. import cache, cron, metrics
+from ..event import Event, NO_CHANGES
 
 logger = logging.getLogger(__name__)
 
+# Executors made from an executor class, one per class and max_workers for
+# the whole process rather than one per execute()
+_executors = dict()
+_executors_lock = threading.Lock()
+
+
+def shared_executor(executor_class, max_workers=None):
+    """Return the process wide executor of a class, creating it once.
+
+    :param executor_class: i.e. ThreadPoolExecutor or ProcessPoolExecutor
+    :param max_workers: max_workers for the executor
+    """
+    key = (executor_class, max_workers)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            logger.debug("Creating shared %s", executor_class.__name__)
+            executor = _executors[key] = executor_class(
+                max_workers=max_workers
+            )
+    return executor
+
+
+def shutdown_executors(wait=True):
+    """Shut down the shared executors, new ones are created when next used.
+
+    :param wait: Wait for the running jobs to finish *default=True*
+    """
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
+
+
+def _execute_job(job, result_cache=None):
+    """Execute a job returning the job and any exception it raised.
+
+    This is module level so it can be sent to a ProcessPoolExecutor, in which
+    case the job returned is the copy that ran in the other process.
+
+    :param job: The Event to execute
+    :param result_cache: Optional ResultCache for the start and complete
+    results
+    """
+    try:
+        job.execute(result_cache)
+    except Exception as e:
+        return job, e
+    return job, None
+
+
+async def _execute_job_async(job, limit=None, result_cache=None):
+    """Await a job returning the job and any exception it raised.
+
+    :param job: The Event to execute
+    :param limit: Optional asyncio.Semaphore bounding concurrent jobs
+    :param result_cache: Optional ResultCache for the start and complete
+    results
+    """
+    try:
+        if limit is None:
+            await job.execute_async(result_cache)
+        else:
+            async with limit:
+                await job.execute_async(result_cache)
+    except Exception as e:
+        return job, e
+    return job, None
+
+
+def _metric_tags(schedule, *args, **kwargs):
+    """Return the tags execute() is timed with."""
+    return {"uuid": schedule.uuid}
+
 
 class Schedule(object):
     """Schedule class Stores a list of Jobs for a given schedule."""
 
+    __slots__ = (
+        "_jobs", "_when", "_cron", "_id", "_uuid", "_completed", "_executor",
+        "_max_workers", "_dirty", "__weakref__"
+    )
+
     def __init__(self, **kwargs):
         """Create the jobs list.
 
         :param when: When as a datetime object or a crontab string
-        :param cron: The corn string used if one was
+        :param cron: The CronTab, or crontab string, used if one was
         :param id: The id from the DB
         :param uuid: The uuid of the schedule obj
         :param completed: Boolean value fro all jobs completed
+        :param executor: Optional Executor class (i.e. ThreadPoolExecutor or
+        ProcessPoolExecutor) or instance used to run the jobs concurrently,
+        a class is created once and shared by every schedule using it, see
+        shared_executor()
+        :param max_workers: max_workers for an executor class
         """
         logger.debug("Creating Schedule")
         self._jobs = []
         self._when = kwargs.get("when")
         self._cron = kwargs.get("cron")
+        if isinstance(self._cron, str):
+            self._cron = cron.parse(self._cron)
         self._id = kwargs.get("id")
-        self._uuid = kwargs.get("uuid", pyuuid.uuid4().hex)
+        # Generated when first asked for
+        self._uuid = kwargs.get("uuid")
         self._completed = kwargs.get("completed", False)
+        self._executor = kwargs.get("executor")
+        self._max_workers = kwargs.get("max_workers")
+        # Fields changed since the schedule was created, loaded or saved
+        self._dirty = NO_CHANGES
 
     def __str__(self):
         """Create a printed string."""
         return "UUID: {}, ID: {}, WHEN: {}, CRON: {}, JOBS: {}".format(
-            self._uuid, self._id, self._when, self._cron, self._jobs
+            self.uuid, self._id, self._when, self._cron, self._jobs
         )
 
+    def __getstate__(self):
+        """Pickle the slots, generating the uuid first so copies share it."""
+        self.uuid
+        return (None, {
+            slot: getattr(self, slot) for slot in self.__slots__
+            if slot != "__weakref__" and hasattr(self, slot)
+        })
+
+    @property
+    def dirty(self):
+        """Return the fields changed since the last save."""
+        return self._dirty
+
+    def _change(self, field):
+        """Record a field as changed since the last save.
+
+        :param field: The name of the field
+        """
+        if not self._dirty:
+            cache.changed(self)
+        self._dirty |= {field}
+
+    def mark_clean(self, fields=None):
+        """Forget the changes, i.e. once they have been saved.
+
+        :param fields: Only forget the changes to these fields *default=all*
+        """
+        if fields is None:
+            self._dirty = NO_CHANGES
+        else:
+            self._dirty -= frozenset(fields)
+        if not self._dirty:
+            cache.saved(self)
+
     @property
     def completed(self):
         """Return the UUID."""
@@ -51,7 +182,9 @@ class Schedule(object):
 
     @property
     def uuid(self):
-        """Return the UUID."""
+        """Return the UUID, generating it on first use."""
+        if self._uuid is None:
+            self._uuid = pyuuid.uuid4().hex
         return self._uuid
 
     @uuid.setter
@@ -104,7 +237,7 @@ class Schedule(object):
             else:
                 self._jobs.append(Event(jobs, until_success=True))
         except Exception as e:
-            logger.error("Could not assign Job with error: {}".format(e))
+            logger.error("Could not assign Job with error: %s", e)
             raise exceptions.JobAssignmentFailed
 
     @property
@@ -119,28 +252,27 @@ class Schedule(object):
         :param value: can be datetime (in the future) or a crontab
         """
         if isinstance(value, datetime.date):
-            logger.debug("When is a datetime: {}".format(value))
+            logger.debug("When is a datetime: %s", value)
             if value <= datetime.datetime.now():
                 logger.error("When is older than now.")
                 raise exceptions.WhenValueInPast
             self._when = value
+            self._change("when")
         elif isinstance(value, str):
-            logger.debug("When is a string: {}".format(value))
+            logger.debug("When is a string: %s", value)
             try:
-                entry = CronTab(value)
+                entry = cron.parse(value)
                 self._cron = entry
-                # Use the new behaviour, unsure how this breaks things...
-                # It all seems overly complicated this time milarky
-                next = entry.next(default_utc=False)
-                if next > 0:
-                    self._when = datetime.datetime.now() + \
-                        datetime.timedelta(0, next)
+                next = cron.next_fire(entry)
+                if next is not None:
+                    self._when = next
+                    self._change("when")
                 else:
                     logger.error("When is older than now.")
                     raise exceptions.WhenValueInPast
             except Exception as e:
-                logger.error("Exception creating crontab from Value: {} with \
-exception {}".format(value, e))
+                logger.error("Exception creating crontab from Value: %s with \
+exception %s", value, e)
                 raise exceptions.FailedToCreateDatetimeFromCronTab
 
         else:
@@ -160,68 +292,190 @@ exception {}".format(value, e))
             else:
                 found = True
         if not found:
-            logger.info("No job found with uuid: {}".format(job_uuid))
+            logger.info("No job found with uuid: %s", job_uuid)
             raise exceptions.JobNotFound
         else:
             logger.debug("Replacing Jobs with new jobs")
             self._jobs = new_jobs
 
-    def execute(self):
-        """Execute the jobs.
+    def _should_run(self, job):
+        """Test if a job needs to run.
 
-        :return: True if executed, False if not everything else raises an error
+        :param job: The job to test
+        """
+        if not isinstance(job, Event):
+            raise exceptions.JobIsNotAnEventObject
+        if job.completed:
+            logger.debug("Skipping already completed Job %s", job.uuid)
+            return False
+        logger.debug("Executing event, Job number %s", job.uuid)
+        return True
+
+    def _job_failed(self, job, error):
+        """Handle the outcome of a job.
+
+        :param job: The job that ran
+        :param error: The exception the job raised or None
+        :return: True if the schedule should stop executing
         """
-        logger.info("Executing Jobs ({})".format(len(self._jobs)))
-        logger.debug("WHEN: {}".format(self._when))
-        logger.debug("NOW : {}".format(datetime.datetime.now()))
+        if error is None:
+            return False
+        elif isinstance(error, exceptions.FailedToReturnBooleanValue):
+            return True
+        elif isinstance(error, exceptions.GeneralEventsException):
+            logger.debug("Caught General exception: %s", error)
+            return True
+        elif isinstance(error, exceptions.EventAlreadyCompleted):
+            logger.debug("Event completed between executions")
+            return False
+        raise error
+
+    def _execute_concurrently(self, jobs, result_cache=None):
+        """Run the jobs on the executor.
+
+        Every job runs, the outcomes are returned in the same order as the
+        jobs and handled in that order. Unlike running one at a time, jobs
+        after one that fails have already run.
+
+        :param jobs: The jobs to run
+        :param result_cache: Optional ResultCache for the start and complete
+        results, each process of a ProcessPoolExecutor gets its own
+        :return: A list of (job, exception or None) tuples
+        """
+        logger.debug("Running %s jobs on %s", len(jobs), self._executor)
+        run = functools.partial(_execute_job, result_cache=result_cache)
+        executor = self._executor
+        if not isinstance(executor, Executor):
+            executor = shared_executor(executor, self._max_workers)
+        results = list(executor.map(run, jobs))
+        outcomes = list()
+        for job, (ran, error) in zip(jobs, results):
+            if ran is not job:
+                # Ran in another process so copy back what changed
+                job.merge(ran)
+            outcomes.append((job, error))
+        return outcomes
+
+    def _is_due(self, now):
+        """Test if the schedule should execute at now."""
+        logger.debug("WHEN: %s", self._when)
+        logger.debug("NOW : %s", now)
         # Execute ONLY if When is older than Now.
-        if isinstance(self._when, datetime.date)\
-                and self._when <= datetime.datetime.now()\
-                and not self._completed:
-            for job in self._jobs:
-                if isinstance(job, Event):
-                    logger.debug("Executing event, Job number {}".format(
-                        job.uuid
-                    ))
-                    if not job.completed:
-                        try:
-                            job.execute()
-                        except exceptions.FailedToReturnBooleanValue:
-                            return False
-                        except exceptions.GeneralEventsException as e:
-                            logger.debug("Caught General exception: {}".format(
-                                e
-                            ))
-                            return False
-                        except exceptions.EventAlreadyCompleted:
-                            logger.info("Event completed between executions")
-                    else:
-                        logger.debug(
-                            "Skipping already completed Job {}".format(
-                                job.uuid
-                            )
-                        )
+        return isinstance(self._when, datetime.date)\
+            and self._when <= now\
+            and not self._completed
+
+    def _record_lag(self, now):
+        """Record how late the schedule fires while metrics are enabled."""
+        if metrics.enabled():
+            metrics.timing(
+                "schedule.lag", (now - self._when).total_seconds(),
+                uuid=self.uuid
+            )
+
+    def _reschedule(self, next_fire=None, now=None):
+        """Complete or reschedule once the jobs have run.
+
+        :param next_fire: Returns when a crontab next fires
+        *default=cron.next_fire*
+        :param now: Reschedule to the next fire after this
+        *default=datetime.now()*
+        """
+        if all(event.completed for event in self._jobs):
+            logger.debug("All jobs in a completed condition")
+            self._completed = True
+            self._change("completed")
+            return True
+        else:
+            logger.debug("Rescheduling jobs")
+            logger.debug("Checking if cron is an isntance of Crontab")
+            if isinstance(self._cron, CronTab):
+                logger.debug("Scheduling Next run")
+                if next_fire is None:
+                    next = cron.next_fire(self._cron, now)
                 else:
-                    raise exceptions.JobIsNotAnEventObject
-            if all(event.completed for event in self._jobs):
-                logger.info("All jobs in a completed condition")
-                self._completed = True
+                    next = next_fire(self._cron)
+                if next is None:
+                    msg = "Jobs are not 'completed' but the crontab never \
+fires again"
+                    logger.error(msg)
+                    raise exceptions.GeneralEventsException(msg)
+                self._when = next
+                self._change("when")
                 return True
-            else:
-                logger.info("Rescheduling jobs")
-                logger.debug("Checking if cron is an isntance of Crontab")
-                if isinstance(self._cron, CronTab):
-                    logger.info("Scheduling Next run")
-                    self._when = datetime.datetime.now() + datetime.timedelta(
-                        seconds=self._cron.next(default_utc=False)
-                    )
-                    return True
-                elif self._cron is None:
-                    msg = "Jobs are not 'completed' but no crontab provided. \
+            elif self._cron is None:
+                msg = "Jobs are not 'completed' but no crontab provided. \
 For one off tasks set until_success=True on the job(s), set a \
 complete_function or provide a crontab"
-                    logger.error(msg)
-                    raise exceptions.GeneralEventsException(msg)
+                logger.error(msg)
+                raise exceptions.GeneralEventsException(msg)
+
+    @metrics.timed("schedule.execute", _metric_tags)
+    def execute(self, reschedule=True, result_cache=None, now=None):
+        """Execute the jobs.
+
+        If the schedule has an executor the jobs run concurrently on it,
+        otherwise they run one at a time.
+
+        :param reschedule: False to leave completing or rescheduling to
+        cron.reschedule_many() *default=True*
+        :param result_cache: Optional ResultCache the jobs share start and
+        complete results through
+        :param now: The datetime to test against and reschedule after
+        *default=datetime.now()*
+        :return: True if executed, False if not everything else raises an error
+        """
+        logger.debug("Executing Jobs (%s)", len(self._jobs))
+        now = now or datetime.datetime.now()
+        if self._is_due(now):
+            self._record_lag(now)
+            if self._executor is None:
+                for job in self._jobs:
+                    if self._should_run(job) and self._job_failed(
+                        *_execute_job(job, result_cache)
+                    ):
+                        return False
+            else:
+                jobs = [job for job in self._jobs if self._should_run(job)]
+                outcomes = self._execute_concurrently(jobs, result_cache)
+                for job, error in outcomes:
+                    if self._job_failed(job, error):
+                        return False
+            return self._reschedule(now=now) if reschedule else True
+        else:
+            logger.debug("Jobs not executed")
+            return False
+
+    @metrics.timed("schedule.execute", _metric_tags)
+    async def execute_async(self, limit=None, result_cache=None, now=None):
+        """Execute the jobs concurrently on the running event loop.
+
+        Behaves as execute(), the outcome of each job is handled in job order
+        once they have all finished.
+
+        :param limit: Optional asyncio.Semaphore bounding concurrent jobs,
+        share one between schedules to bound the jobs across all of them
+        :param result_cache: Optional ResultCache the jobs share start and
+        complete results through
+        :param now: The datetime to test against and reschedule after
+        *default=datetime.now()*
+        :return: True if executed, False if not everything else raises an error
+        """
+        logger.debug("Executing Jobs (%s)", len(self._jobs))
+        now = now or datetime.datetime.now()
+        if self._is_due(now):
+            self._record_lag(now)
+            jobs = [job for job in self._jobs if self._should_run(job)]
+            outcomes = await asyncio.gather(
+                *(
+                    _execute_job_async(job, limit, result_cache)
+                    for job in jobs
+                )
+            )
+            for job, error in outcomes:
+                if self._job_failed(job, error):
+                    return False
+            return self._reschedule(now=now)
         else:
             logger.debug("Jobs not executed")
             return False
@@ -0,0 +1,356 @@
+"""Scheduler Module.
+
+Keeps in-memory Schedules in a min-heap ordered by when so finding the due
+schedules costs O(k log N) for k due out of N, rather than calling execute()
+on every schedule. TimerWheel buckets them by minute instead, so a tick costs
+O(k) however many are idle.
+"""
+
+import datetime
+import heapq
+import itertools
+import logging
+from .. import cron, exceptions, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler(object):
+    """Scheduler class orders Schedules by when they next fire."""
+
+    def __init__(self, schedules=None, retry=60):
+        """Create the heap.
+
+        :param schedules: Optional iterable of schedules to add
+        :param retry: Seconds before a schedule that executed but is still
+        due (i.e. a job failed) is tried again *default=60*
+        """
+        # Entries are [fire at, sequence, schedule, when], the sequence breaks
+        # ties so schedules are never compared. A removed entry has schedule
+        # None. when is the schedule's when as it was added.
+        self._retry = datetime.timedelta(seconds=retry)
+        self._heap = []
+        self._entries = dict()
+        self._sequence = itertools.count()
+        for schedule in schedules or []:
+            self.add(schedule)
+
+    def __len__(self):
+        """Return the number of schedules waiting to fire."""
+        return len(self._entries)
+
+    def __contains__(self, schedule_uuid):
+        """Test if a schedule uuid is waiting to fire."""
+        return schedule_uuid in self._entries
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SCHEDULES: {}, NEXT DUE: {}".format(
+            len(self._entries), self.next_due()
+        )
+
+    @property
+    def schedules(self):
+        """Return the schedules waiting to fire."""
+        return [entry[2] for entry in self._entries.values()]
+
+    def add(self, schedule, at=None):
+        """Add a schedule, or move it if its when has changed.
+
+        Completed schedules and schedules without a when are not added.
+
+        :param schedule: The schedule to add
+        :param at: When to fire the schedule *default=schedule.when*
+        """
+        self._invalidate(schedule.uuid)
+        if schedule.completed or not isinstance(schedule.when, datetime.date):
+            logger.debug(
+                "Not adding schedule %s as it can not fire", schedule.uuid
+            )
+            return False
+        entry = [
+            at or schedule.when, next(self._sequence), schedule, schedule.when
+        ]
+        self._entries[schedule.uuid] = entry
+        heapq.heappush(self._heap, entry)
+        return True
+
+    def remove(self, schedule_uuid):
+        """Remove a schedule.
+
+        :param schedule_uuid: The uuid of the schedule to remove
+        """
+        if not self._invalidate(schedule_uuid):
+            logger.info("No schedule found with uuid: %s", schedule_uuid)
+            raise exceptions.NoSchedulesProvided(
+                "Schedule {} not found".format(schedule_uuid)
+            )
+
+    def _invalidate(self, schedule_uuid):
+        """Mark the heap entry of a schedule as removed.
+
+        The entry stays in the heap until it reaches the top, which keeps
+        removal O(1).
+        """
+        entry = self._entries.pop(schedule_uuid, None)
+        if entry is None:
+            return False
+        entry[2] = None
+        return True
+
+    def _prune(self):
+        """Drop removed entries from the top of the heap.
+
+        A schedule whose when was changed while it was in the heap is put
+        back in the right place once it reaches the top, so add() must be
+        called again for a schedule moved earlier.
+        """
+        while self._heap:
+            at, sequence, schedule, when = self._heap[0]
+            if schedule is None:
+                heapq.heappop(self._heap)
+            elif schedule.when != when:
+                heapq.heappop(self._heap)
+                del self._entries[schedule.uuid]
+                self.add(schedule)
+            else:
+                return
+
+    def next_due(self):
+        """Return when the earliest schedule fires, None if there are none."""
+        self._prune()
+        if self._heap:
+            return self._heap[0][0]
+        return None
+
+    def pop_due(self, now=None):
+        """Remove and return the schedules due at now, earliest first.
+
+        :param now: The datetime to test against *default=datetime.now()*
+        """
+        now = now or datetime.datetime.now()
+        due = list()
+        self._prune()
+        while self._heap and self._heap[0][0] <= now:
+            at, sequence, schedule, when = heapq.heappop(self._heap)
+            del self._entries[schedule.uuid]
+            due.append(schedule)
+            self._prune()
+        return due
+
+    @metrics.timed("scheduler.tick")
+    def tick(self, now=None, result_cache=None):
+        """Execute the due schedules and add them back at their next when.
+
+        The schedules that ran are rescheduled together by
+        cron.reschedule_many(). A schedule that raises is logged and not
+        added back, one that is still due afterwards is retried after the
+        retry delay. Otherwise they would stay due and run on every tick.
+
+        :param now: The datetime the schedules are executed and rescheduled
+        at *default=datetime.now()*
+        :param result_cache: Optional ResultCache the jobs of this tick share
+        start and complete results through
+        :return: Every schedule that was due, including any that failed or
+        did not run
+        """
+        now = now or datetime.datetime.now()
+        due = self.pop_due(now)
+        logger.info("%s schedules due", len(due))
+        executed = list()
+        failed = set()
+        for schedule in due:
+            try:
+                if schedule.execute(
+                    reschedule=False, result_cache=result_cache, now=now
+                ):
+                    executed.append(schedule)
+            except Exception as e:
+                logger.error(
+                    "Schedule %s failed with error: %s, removing it",
+                    schedule.uuid, e
+                )
+                failed.add(schedule.uuid)
+        # Work out the next when of everything that ran together
+        for schedule, e in cron.reschedule_many(executed, now):
+            logger.error(
+                "Schedule %s failed with error: %s, removing it",
+                schedule.uuid, e
+            )
+            failed.add(schedule.uuid)
+        for schedule in due:
+            if schedule.uuid in failed:
+                continue
+            if isinstance(schedule.when, datetime.date) \
+                    and schedule.when <= now:
+                self.add(schedule, now + self._retry)
+            else:
+                self.add(schedule)
+        return due
+
+
+def _minute(at):
+    """Return the start of the minute of a datetime."""
+    return at.replace(second=0, microsecond=0)
+
+
+def _hour(at):
+    """Return the start of the hour of a datetime."""
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+class TimerWheel(Scheduler):
+    """TimerWheel class buckets Schedules by when they fire.
+
+    A hierarchical timing wheel: schedules firing in the current hour are in
+    a bucket per minute, those later today in a bucket per hour and the rest
+    in a bucket per day. A bucket is split in to the level below when the
+    wheel reaches it, so each tick only touches the buckets it passes and the
+    schedules in them however many schedules are idle.
+    """
+
+    def __init__(self, schedules=None, retry=60, now=None):
+        """Create the wheel.
+
+        :param schedules: Optional iterable of schedules to add
+        :param retry: Seconds before a schedule that executed but is still
+        due (i.e. a job failed) is tried again *default=60*
+        :param now: The minute the wheel starts at *default=datetime.now()*
+        """
+        # Buckets are dicts of uuid to entry, an entry is
+        # [fire at, (level, bucket key), schedule, when]
+        self._minutes = dict()
+        self._hours = dict()
+        self._days = dict()
+        self._cursor = _minute(now or datetime.datetime.now())
+        super(TimerWheel, self).__init__(schedules, retry)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SCHEDULES: {}, NEXT DUE: {}, BUCKETS: {}/{}/{}".format(
+            len(self._entries), self.next_due(), len(self._minutes),
+            len(self._hours), len(self._days)
+        )
+
+    def add(self, schedule, at=None):
+        """Add a schedule, or move it if its when has changed.
+
+        Completed schedules and schedules without a when are not added.
+
+        :param schedule: The schedule to add
+        :param at: When to fire the schedule *default=schedule.when*
+        """
+        self._invalidate(schedule.uuid)
+        if schedule.completed or not isinstance(schedule.when, datetime.date):
+            logger.debug(
+                "Not adding schedule %s as it can not fire", schedule.uuid
+            )
+            return False
+        entry = [at or schedule.when, None, schedule, schedule.when]
+        self._entries[schedule.uuid] = entry
+        self._place(schedule.uuid, entry)
+        return True
+
+    def _place(self, schedule_uuid, entry):
+        """Put an entry in the bucket it fires in, relative to the cursor."""
+        at = entry[0]
+        if _minute(at) <= self._cursor:
+            # Overdue so fires at the next tick
+            level, key = self._minutes, self._cursor
+        elif _hour(at) == _hour(self._cursor):
+            level, key = self._minutes, _minute(at)
+        elif at.date() == self._cursor.date():
+            level, key = self._hours, _hour(at)
+        else:
+            level, key = self._days, at.date()
+        entry[1] = (level, key)
+        level.setdefault(key, dict())[schedule_uuid] = entry
+
+    def _invalidate(self, schedule_uuid):
+        """Take a schedule out of its bucket."""
+        entry = self._entries.pop(schedule_uuid, None)
+        if entry is None:
+            return False
+        level, key = entry[1]
+        bucket = level[key]
+        del bucket[schedule_uuid]
+        if not bucket:
+            del level[key]
+        return True
+
+    def _advance(self, to):
+        """Move the cursor to the next bucket at or before a minute.
+
+        Empty minutes, hours and days are skipped. Entering an hour or a day
+        splits its bucket in to the level below.
+        """
+        steps = [to]
+        if self._minutes:
+            steps.append(min(self._minutes))
+        if self._hours:
+            steps.append(min(self._hours))
+        if self._days:
+            day = min(self._days)
+            steps.append(datetime.datetime(day.year, day.month, day.day))
+        cursor = min(steps)
+        if cursor <= self._cursor:
+            cursor = self._cursor + datetime.timedelta(minutes=1)
+        new_day = cursor.date() != self._cursor.date()
+        new_hour = _hour(cursor) != _hour(self._cursor)
+        self._cursor = cursor
+        if new_day:
+            self._split(self._days.pop(cursor.date(), None))
+        if new_hour:
+            self._split(self._hours.pop(_hour(cursor), None))
+
+    def _split(self, bucket):
+        """Put the entries of a bucket in to the level below."""
+        for schedule_uuid, entry in (bucket or dict()).items():
+            self._place(schedule_uuid, entry)
+
+    def next_due(self):
+        """Return when the earliest schedule fires, None if there are none."""
+        for level in (self._minutes, self._hours, self._days):
+            if level:
+                return min(entry[0] for entry in level[min(level)].values())
+        return None
+
+    def pop_due(self, now=None):
+        """Remove and return the schedules due at now, earliest first.
+
+        :param now: The datetime to test against *default=datetime.now()*
+        """
+        now = now or datetime.datetime.now()
+        minute = _minute(now)
+        due = list()
+        while True:
+            due.extend(self._pop_bucket(now))
+            if self._cursor >= minute:
+                break
+            self._advance(minute)
+        return [entry[2] for entry in sorted(due, key=lambda e: e[0])]
+
+    def _pop_bucket(self, now):
+        """Remove the entries due at now from the bucket at the cursor.
+
+        A schedule whose when was changed while it was in the wheel is put
+        back where its new when fires, so add() must be called again for a
+        schedule moved earlier.
+        """
+        popped = list()
+        while self._cursor in self._minutes:
+            ready = [
+                (schedule_uuid, entry)
+                for schedule_uuid, entry in self._minutes[self._cursor].items()
+                if entry[0] <= now
+            ]
+            if not ready:
+                break
+            for schedule_uuid, entry in ready:
+                self._invalidate(schedule_uuid)
+                schedule = entry[2]
+                if schedule.when != entry[3]:
+                    self.add(schedule)
+                else:
+                    popped.append(entry)
+        return popped
@@ -0,0 +1,136 @@
+"""ScheduleSet Module.
+
+An in-memory collection of Schedules indexed by uuid and DB id, so finding or
+removing one schedule does not mean scanning (or copying) every schedule.
+"""
+
+import logging
+from .. import exceptions
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleSet(object):
+    """ScheduleSet class holds Schedules in the order they were added.
+
+    Iterating gives the schedules, so a ScheduleSet can be passed anywhere a
+    list of schedules is taken, i.e. eventmagic.save().
+    """
+
+    def __init__(self, schedules=None):
+        """Create the set.
+
+        :param schedules: Optional iterable of schedules to add
+        """
+        self._schedules = dict()
+        self._ids = dict()
+        # Schedules added before they were saved, indexed by id once they
+        # have one by index_saved()
+        self._unsaved = set()
+        for schedule in schedules or []:
+            self.add(schedule)
+
+    def __len__(self):
+        """Return the number of schedules."""
+        return len(self._schedules)
+
+    def __iter__(self):
+        """Iterate over the schedules."""
+        return iter(list(self._schedules.values()))
+
+    def __contains__(self, schedule_uuid):
+        """Test if a schedule uuid is in the set."""
+        return schedule_uuid in self._schedules
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SCHEDULES: {}".format(len(self._schedules))
+
+    def add(self, schedule):
+        """Add a schedule, replacing one with the same uuid.
+
+        :param schedule: The schedule to add
+        """
+        self.discard(schedule.uuid)
+        self._schedules[schedule.uuid] = schedule
+        if schedule.id:
+            self._ids[schedule.id] = schedule.uuid
+        else:
+            self._unsaved.add(schedule.uuid)
+
+    def get(self, schedule_uuid, default=None):
+        """Return the schedule with a uuid.
+
+        :param schedule_uuid: The uuid to look up
+        :param default: Returned if there is no such schedule
+        """
+        return self._schedules.get(schedule_uuid, default)
+
+    def get_by_id(self, schedule_id, default=None):
+        """Return the schedule with a DB id.
+
+        :param schedule_id: The id to look up
+        :param default: Returned if there is no such schedule
+        """
+        if schedule_id not in self._ids:
+            # Saved some other way than eventmagic.save(schedule_set)
+            self.index_saved()
+        schedule = self._schedules.get(self._ids.get(schedule_id))
+        # The id is dropped if a save of the schedule fails
+        if schedule is None or schedule.id != schedule_id:
+            return default
+        return schedule
+
+    def index_saved(self):
+        """Index the schedules that have been saved since they were added.
+
+        Called by eventmagic.save() when it is given the set.
+        """
+        for schedule_uuid in list(self._unsaved):
+            schedule = self._schedules[schedule_uuid]
+            if schedule.id:
+                self._ids[schedule.id] = schedule_uuid
+                self._unsaved.discard(schedule_uuid)
+
+    def discard(self, *schedule_uuids):
+        """Remove schedules by uuid, ignoring any that are not in the set.
+
+        :param schedule_uuids: The uuids of the schedules to remove
+        :return: A list of the schedules removed
+        """
+        removed = list()
+        for schedule_uuid in schedule_uuids:
+            schedule = self._schedules.pop(schedule_uuid, None)
+            if schedule is None:
+                continue
+            self._unsaved.discard(schedule_uuid)
+            if self._ids.get(schedule.id) == schedule_uuid:
+                del self._ids[schedule.id]
+            removed.append(schedule)
+        return removed
+
+    def discard_by_id(self, *schedule_ids):
+        """Remove schedules by DB id, ignoring any that are not in the set.
+
+        :param schedule_ids: The DB ids of the schedules to remove
+        :return: A list of the schedules removed
+        """
+        return self.discard(*[
+            schedule.uuid for schedule in (
+                self.get_by_id(schedule_id) for schedule_id in schedule_ids
+            ) if schedule is not None
+        ])
+
+    def remove(self, schedule_uuid):
+        """Remove a schedule by uuid.
+
+        :param schedule_uuid: The uuid of the schedule to remove
+        :return: The schedule removed
+        """
+        removed = self.discard(schedule_uuid)
+        if not removed:
+            logger.info("No schedule found with uuid: %s", schedule_uuid)
+            raise exceptions.NoSchedulesProvided(
+                "Schedule {} not found".format(schedule_uuid)
+            )
+        return removed[0]
@@ -0,0 +1,275 @@
+"""Serialize Module.
+
+Converts the functions and params of an Event to and from the bytes stored
+in the DB. Registered functions are stored as a short reference rather than
+pickled.
+"""
+
+import functools
+import hashlib
+import importlib
+import logging
+import pickle
+import zlib
+from .. import exceptions
+
+logger = logging.getLogger(__name__)
+
+# Marks a stored reference, pickles always start with the protocol opcode
+# so can never start with this
+REFERENCE_PREFIX = b"ref:"
+# Marks the hash of a value held in the `blobs` table
+BLOB_PREFIX = b"blob:"
+
+# Reference to function and function to reference for registered functions
+_functions = dict()
+_references = dict()
+
+
+def register(name=None, func=None):
+    """Register a function so it is stored by reference instead of pickled.
+
+    The reference is the name given or the function's module:qualname. A
+    process loading events must be able to resolve it, either by importing
+    the module that registered the name or, for module:qualname, by import.
+    Can be used as a decorator with or without a name::
+
+        eventmagic.register("send_email", send_email)
+
+        @eventmagic.register
+        def send_email():
+
+        @eventmagic.register("send_email")
+        def send_email():
+
+    :param name: The name to store the function as
+    :param func: The function to register
+    """
+    if callable(name) and func is None:
+        name, func = None, name
+    if func is None:
+        return functools.partial(register, name)
+    reference = name or "{}:{}".format(func.__module__, func.__qualname__)
+    logger.debug("Registering function %s as %s", func, reference)
+    _functions[reference] = func
+    _references[func] = reference
+    resolve.cache_clear()
+    return func
+
+
+def reference_of(func):
+    """Return the reference of a registered function or None.
+
+    :param func: The function to look up
+    """
+    try:
+        return _references.get(func)
+    except TypeError:
+        # Unhashable callables can not be registered
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def resolve(reference):
+    """Return the function for a reference.
+
+    :param reference: A registered name or a module:qualname
+    """
+    if reference in _functions:
+        return _functions[reference]
+    module_name, _, qualname = reference.partition(":")
+    if not qualname:
+        raise exceptions.FunctionNotFound(
+            "No function registered as {}".format(reference)
+        )
+    try:
+        func = importlib.import_module(module_name)
+        for attribute in qualname.split("."):
+            func = getattr(func, attribute)
+    except (ImportError, AttributeError) as e:
+        logger.error("Could not resolve function %s: %s", reference, e)
+        raise exceptions.FunctionNotFound(e)
+    return func
+
+
+def function_to_bytecode(func):
+    """Save a function.
+
+    Registered functions are saved as a reference, anything else is pickled.
+
+    :param func: The function to save
+    """
+    reference = reference_of(func)
+    if reference is not None:
+        logger.log(5, "Function is registered as %s", reference)
+        return REFERENCE_PREFIX + reference.encode("utf-8")
+    elif callable(func):
+        logger.log(5, "Manipulate function to json")
+        code = pickle.dumps(func, protocol=pickle.HIGHEST_PROTOCOL)
+        return code
+    else:
+        logger.log(5, "Not a function")
+        return None
+
+
+def bytecode_to_function(bytes):
+    """Convert json back to a function.
+
+    :param json: the json object to convert back to a python function
+    """
+    logger.debug(
+        "Converting bytes (type: %s) to function", type(bytes)
+    )
+    if bytes and bytes.startswith(REFERENCE_PREFIX):
+        return resolve(bytes[len(REFERENCE_PREFIX):].decode("utf-8"))
+    elif bytes:
+        logger.debug("Creating Function from bytes")
+        func = pickle.loads(bytes)
+        return func
+    else:
+        return None
+
+
+def params_to_bytes(params):
+    """Save params.
+
+    :param params: The params dictionary to save
+    """
+    return pickle.dumps(params, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def bytes_to_params(bytes):
+    """Convert bytes back to params.
+
+    :param bytes: The bytes created by params_to_bytes
+    """
+    return pickle.loads(bytes)
+
+
+class Serialized(object):
+    """Serialized class holds bytes from the DB until they are needed.
+
+    The bytes are only decoded the first time the value is asked for, the
+    result is kept so they are decoded at most once.
+    """
+
+    __slots__ = ("_data", "_decoder", "_value", "_decoded")
+
+    def __init__(self, data, decoder):
+        """Store the bytes.
+
+        :param data: The bytes as read from the DB
+        :param decoder: The function that turns the bytes in to the value
+        """
+        self._data = data
+        self._decoder = decoder
+        self._value = None
+        self._decoded = False
+
+    def __str__(self):
+        """Create a printed string without decoding."""
+        if self._decoded:
+            return str(self._value)
+        return "<serialized {} bytes>".format(len(self._data or b""))
+
+    @property
+    def data(self):
+        """Return the bytes."""
+        return self._data
+
+    @property
+    def decoded(self):
+        """Return if the bytes have been decoded."""
+        return self._decoded
+
+    def decode(self):
+        """Return the value, decoding the bytes on first use."""
+        if not self._decoded:
+            self._value = self._decoder(self._data)
+            self._decoded = True
+            # The bytes are not needed once decoded
+            self._data = None
+        return self._value
+
+
+def to_blob(data, blobs, inline_size=64):
+    """Move a value in to a set of blobs, returning the column value.
+
+    Values no bigger than *inline_size* stay in the column as they are
+    smaller than the reference.
+
+    :param data: The bytes to store
+    :param blobs: A dictionary of hash to bytes the value is added to
+    :param inline_size: The largest value kept in the column
+    """
+    if data is None or len(data) <= inline_size:
+        return data
+    digest = hashlib.sha256(data).hexdigest()
+    blobs[digest] = data
+    return BLOB_PREFIX + digest.encode("ascii")
+
+
+def compress(data, min_size=256):
+    """Compress a blob if it is worth it.
+
+    :param data: The bytes to compress
+    :param min_size: Blobs smaller than this are not compressed
+    :return: A tuple of whether it was compressed and the bytes to store
+    """
+    if len(data) >= min_size:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return True, compressed
+    return False, data
+
+
+def _decompress(decoder, data):
+    """Decompress a blob then decode it.
+
+    Module level so a Serialized using it can be pickled.
+    """
+    return decoder(zlib.decompress(data))
+
+
+class BlobCache(object):
+    """BlobCache class shares the blobs read by one load between events.
+
+    Each distinct blob is wrapped in a single Serialized so it is decoded at
+    most once and every event using it gets the same decoded object.
+    """
+
+    def __init__(self, blobs=None):
+        """Store the blobs.
+
+        :param blobs: A dictionary of hash to (compressed, data) tuples
+        """
+        self._blobs = blobs or dict()
+        self._serialized = dict()
+
+    def __len__(self):
+        """Return the number of blobs."""
+        return len(self._blobs)
+
+    def field(self, value, decoder):
+        """Wrap a column value for lazy decoding.
+
+        :param value: The column value, bytes or a blob reference
+        :param decoder: The function that turns the bytes in to the value
+        """
+        if not value or not value.startswith(BLOB_PREFIX):
+            return Serialized(value, decoder)
+        digest = value[len(BLOB_PREFIX):].decode("ascii")
+        key = (digest, decoder)
+        if key not in self._serialized:
+            if digest not in self._blobs:
+                raise exceptions.FailedToLoadEvents(
+                    "Blob {} not found".format(digest)
+                )
+            compressed, data = self._blobs[digest]
+            if compressed:
+                self._serialized[key] = Serialized(
+                    data, functools.partial(_decompress, decoder)
+                )
+            else:
+                self._serialized[key] = Serialized(data, decoder)
+        return self._serialized[key]
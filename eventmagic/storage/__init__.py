@@ -0,0 +1,134 @@
+"""Storage Module.
+
+A StorageBackend owns the connections to the DB the schedules are stored in
+and the parts of the SQL that differ between DBs. The persistence functions
+in eventmagic take a backend anywhere they take a pool, by default they use
+eventmagic.get_backend().
+"""
+
+import logging
+import eventmagic
+from ..cache import ScheduleCache
+from ..pool import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(object):
+    """StorageBackend class is the base of the DBs schedules are stored in."""
+
+    # The DB errors that mean the DB could not be reached
+    errors = ()
+
+    def __init__(self, **kwargs):
+        """Create the backend.
+
+        :param size: The maximum number of connections *default=5*
+        :param max_age: Seconds before a connection is replaced, 0 disables
+        *default=3600*
+        :param timeout: Seconds to wait for a free connection *default=30*
+        """
+        self._pool = ConnectionPool(
+            self.connect,
+            size=kwargs.get("size", 5),
+            max_age=kwargs.get("max_age", 3600),
+            timeout=kwargs.get("timeout", 30),
+            check=self.check
+        )
+        # Schedules kept between warm invocations by load(cache=True)
+        self._cache = ScheduleCache()
+
+    def __str__(self):
+        """Create a printed string."""
+        return "{}: {}".format(type(self).__name__, self._pool)
+
+    @property
+    def pool(self):
+        """Return the connection pool."""
+        return self._pool
+
+    @property
+    def cache(self):
+        """Return the schedule cache."""
+        return self._cache
+
+    def connection(self):
+        """Borrow a pooled connection for the duration of a with block."""
+        return self._pool.connection()
+
+    def close(self):
+        """Close every idle connection."""
+        self._pool.close()
+
+    def connect(self):
+        """Create a new DB connection."""
+        raise NotImplementedError
+
+    def check(self, conn):
+        """Test if a pooled connection is still usable.
+
+        :param conn: The connection to test
+        """
+        return conn.is_connected()
+
+    def insert_ignore_query(self, table, columns):
+        """Return an INSERT that skips rows whose key already exists.
+
+        :param table: The table to insert in to
+        :param columns: The names of the columns to insert
+        """
+        raise NotImplementedError
+
+    def lock_query(self, query):
+        """Return a SELECT that locks the rows it reads for this transaction.
+
+        Rows already locked by another transaction should be skipped.
+
+        :param query: The SELECT without a trailing semicolon
+        """
+        return query + ";"
+
+    def begin(self, cursor):
+        """Start a transaction that is going to write.
+
+        :param cursor: An open cursor on the connection
+        """
+        pass
+
+    def load(self, cache=False):
+        """Load every Schedule from this backend, see eventmagic.load."""
+        return eventmagic.load(pool=self, cache=cache)
+
+    def iter_schedules(self, batch_size=1000, after=None):
+        """Load the Schedules in pages, see eventmagic.iter_schedules."""
+        return eventmagic.iter_schedules(batch_size, pool=self, after=after)
+
+    def load_due(self, **kwargs):
+        """Load the Schedules that are due, see eventmagic.load_due."""
+        return eventmagic.load_due(pool=self, **kwargs)
+
+    def save(self, schedules, worker=None, renew=0):
+        """Store the Schedules in this backend, see eventmagic.save."""
+        return eventmagic.save(
+            schedules, pool=self, worker=worker, renew=renew
+        )
+
+    def update(self, schedule):
+        """Write the changes to a Schedule, see eventmagic.update."""
+        return eventmagic.update(schedule, pool=self)
+
+    def remove(self, schedules, schedule_uuid):
+        """Delete a Schedule by uuid, see eventmagic.remove_schedule."""
+        return eventmagic.remove_schedule(schedules, schedule_uuid, pool=self)
+
+    def claim(self, worker=None, limit=100, lease=None, now=None):
+        """Lease the due Schedules to a worker, see eventmagic.claim."""
+        return eventmagic.claim(
+            worker=worker, limit=limit, lease=lease, now=now, pool=self
+        )
+
+    def release(self, schedules, worker=None, renew=0):
+        """Give up the lease on Schedules, see eventmagic.release."""
+        return eventmagic.release(
+            schedules, worker=worker, renew=renew, pool=self
+        )
@@ -0,0 +1,76 @@
+"""MySQL Storage Module.
+
+Stores schedules in MySQL, the DB is created with db_setup.sql and the files
+in migrations.
+"""
+
+import logging
+from . import StorageBackend
+from .. import exceptions
+
+try:
+    import mysql.connector
+except ImportError:
+    mysql = None
+
+logger = logging.getLogger(__name__)
+
+
+def db_connection(host, port, username, password, database):
+    """Create a Connection to the DB.
+
+    :param host: The Host address for the DB
+    :param port: the Port for the DB conenction to use
+    :param username: the username to connect with
+    :param password: the password to authenticate with
+    """
+    if mysql is None:
+        raise exceptions.StorageNotAvailable(
+            "mysql-connector-python is not installed"
+        )
+    logger.debug("Connecting to DB")
+    cnx = mysql.connector.connect(
+        user=username, password=password, host=host,
+        port=port, database=database
+    )
+    return cnx
+
+
+class MySQLBackend(StorageBackend):
+    """MySQLBackend class stores schedules in MySQL."""
+
+    errors = (mysql.connector.Error,) if mysql else ()
+
+    def __init__(self, host="", port="3306", username="", password="",
+                 database="eventmagic", **kwargs):
+        """Create the backend, see StorageBackend for the pool options.
+
+        :param host: The Host address for the DB
+        :param port: the Port for the DB conenction to use
+        :param username: the username to connect with
+        :param password: the password to authenticate with
+        :param database: The DB name *default=eventmagic*
+        """
+        self._settings = (host, port, username, password, database)
+        super(MySQLBackend, self).__init__(**kwargs)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "MySQLBackend: {}@{}:{}/{}, {}".format(
+            self._settings[2], self._settings[0], self._settings[1],
+            self._settings[4], self._pool
+        )
+
+    def connect(self):
+        """Create a new DB connection."""
+        return db_connection(*self._settings)
+
+    def insert_ignore_query(self, table, columns):
+        """Return an INSERT IGNORE statement."""
+        return "INSERT IGNORE INTO `{}` ({}) VALUES({});".format(
+            table, ", ".join(columns), ", ".join(["%s"] * len(columns))
+        )
+
+    def lock_query(self, query):
+        """Lock the rows with FOR UPDATE SKIP LOCKED, needs MySQL 8.0."""
+        return query + " FOR UPDATE SKIP LOCKED;"
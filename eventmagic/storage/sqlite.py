@@ -0,0 +1,235 @@
+"""SQLite Storage Module.
+
+Stores schedules in a local SQLite file, for single node deployments and
+for running without a DB server. The tables are created on first connect and
+the DB is put in WAL mode so loads are not blocked by a save.
+"""
+
+import datetime
+import logging
+import sqlite3
+from . import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# The same tables as db_setup.sql and the migrations
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS `events` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `execute_function` BLOB,
+  `execute_params` BLOB,
+  `executed` BOOLEAN,
+  `executions` INT,
+  `count` INT,
+  `start_function` BLOB,
+  `start_params` BLOB,
+  `started` BOOLEAN,
+  `complete_function` BLOB,
+  `complete_params` BLOB,
+  `completed` BOOLEAN,
+  `until_success` BOOLEAN,
+  `uuid` CHAR(32),
+  `updated_at` TEXT
+);
+CREATE TABLE IF NOT EXISTS `schedules` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `when` DATETIME,
+  `cron` BLOB,
+  `uuid` CHAR(32),
+  `completed` BOOLEAN,
+  `lease_owner` VARCHAR(255),
+  `lease_expires` DATETIME,
+  `updated_at` TEXT
+);
+CREATE TABLE IF NOT EXISTS `jobs` (
+  `event_id` INT NOT NULL REFERENCES events (id),
+  `schedule_id` INT NOT NULL REFERENCES schedules (id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS `deleted_schedules` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `schedule_id` INT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS `blobs` (
+  `hash` CHAR(64) NOT NULL PRIMARY KEY,
+  `compressed` BOOLEAN NOT NULL,
+  `data` BLOB
+);
+
+CREATE INDEX IF NOT EXISTS `schedules_completed_when_lease`
+  ON `schedules` (`completed`, `when`, `lease_expires`);
+CREATE INDEX IF NOT EXISTS `schedules_updated_at`
+  ON `schedules` (`updated_at`);
+CREATE INDEX IF NOT EXISTS `schedules_uuid` ON `schedules` (`uuid`);
+CREATE INDEX IF NOT EXISTS `events_uuid` ON `events` (`uuid`);
+CREATE INDEX IF NOT EXISTS `events_updated_at` ON `events` (`updated_at`);
+CREATE INDEX IF NOT EXISTS `jobs_schedule_id` ON `jobs` (`schedule_id`);
+CREATE INDEX IF NOT EXISTS `jobs_event_id` ON `jobs` (`event_id`);
+
+/* SQLite has no ON UPDATE so updated_at is set by triggers, only changes to
+the stored fields count as the lease changes on every claim */
+CREATE TRIGGER IF NOT EXISTS `schedules_inserted` AFTER INSERT ON `schedules`
+BEGIN
+  UPDATE `schedules` SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+  WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS `schedules_updated`
+AFTER UPDATE OF `when`, `cron`, `uuid`, `completed` ON `schedules`
+BEGIN
+  UPDATE `schedules` SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+  WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS `events_inserted` AFTER INSERT ON `events`
+BEGIN
+  UPDATE `events` SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+  WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS `events_updated`
+AFTER UPDATE OF `executed`, `executions`, `count`, `started`, `completed`
+ON `events`
+BEGIN
+  UPDATE `events` SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+  WHERE id = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS `schedules_deleted` AFTER DELETE ON `schedules`
+BEGIN
+  INSERT INTO `deleted_schedules` (`schedule_id`) VALUES (OLD.id);
+END;
+"""
+
+
+def _adapt(value):
+    """Store datetimes as ISO 8601 text, which sorts in time order."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(" ")
+    return value
+
+
+def _convert(value):
+    """Convert a stored DATETIME back in to a datetime."""
+    return datetime.datetime.fromisoformat(value.decode("ascii"))
+
+
+class _Cursor(object):
+    """A cursor taking the same %s params as the MySQL one."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, params=()):
+        self._cursor.execute(
+            query.replace("%s", "?"), tuple(_adapt(p) for p in params)
+        )
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(
+            query.replace("%s", "?"),
+            (tuple(_adapt(p) for p in row) for row in rows)
+        )
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def connection(self):
+        return self._cursor.connection
+
+    def close(self):
+        self._cursor.close()
+
+
+class _Connection(object):
+    """A connection whose cursors take %s params."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _Cursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLiteBackend class stores schedules in a SQLite file."""
+
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path="eventmagic.db", **kwargs):
+        """Create the backend, see StorageBackend for the pool options.
+
+        :param path: The DB file, ":memory:" keeps the DB in memory on a
+        single connection *default=eventmagic.db*
+        :param busy_timeout: Seconds to wait for another process to finish
+        writing *default=30*
+        """
+        self._path = path
+        self._busy_timeout = kwargs.pop("busy_timeout", 30)
+        if path == ":memory:":
+            # Every connection to :memory: is a separate DB
+            kwargs["size"] = 1
+            kwargs["max_age"] = 0
+        super(SQLiteBackend, self).__init__(**kwargs)
+
+    def __str__(self):
+        """Create a printed string."""
+        return "SQLiteBackend: {}, {}".format(self._path, self._pool)
+
+    @property
+    def path(self):
+        """Return the DB file."""
+        return self._path
+
+    def connect(self):
+        """Create a new DB connection, creating the tables if needed."""
+        logger.debug("Connecting to SQLite DB %s", self._path)
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        conn.executescript(SCHEMA)
+        return _Connection(conn)
+
+    def check(self, conn):
+        """Return True as SQLite connections do not drop."""
+        return True
+
+    def insert_ignore_query(self, table, columns):
+        """Return an INSERT OR IGNORE statement."""
+        return "INSERT OR IGNORE INTO `{}` ({}) VALUES({});".format(
+            table, ", ".join(columns), ", ".join(["%s"] * len(columns))
+        )
+
+    def begin(self, cursor):
+        """Take the write lock up front.
+
+        SQLite locks the whole DB rather than rows, so a claim holds the
+        write lock from its SELECT until it commits.
+        """
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE;")
+
+
+sqlite3.register_converter("DATETIME", _convert)
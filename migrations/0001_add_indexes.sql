@@ -0,0 +1,12 @@
+/* Indexes for due-only loading and batched job look ups.
+Run against a DB created with db_setup.sql */
+use `eventmagic`;
+
+/* load_due() filters on completed and when */
+CREATE INDEX `schedules_completed_when` ON `schedules` (`completed`, `when`);
+
+/* Events are attached to schedules by schedule_id */
+CREATE INDEX `jobs_schedule_id` ON `jobs` (`schedule_id`);
+
+/* Events are looked up by uuid */
+CREATE INDEX `events_uuid` ON `events` (`uuid`);
@@ -0,0 +1,10 @@
+/* Leases so several workers can claim due schedules without running the
+same jobs twice. SKIP LOCKED needs MySQL 8.0 or later */
+use `eventmagic`;
+
+ALTER TABLE `schedules`
+  ADD COLUMN `lease_owner` VARCHAR(255),
+  ADD COLUMN `lease_expires` DATETIME;
+
+/* claim() filters on completed, when and lease_expires */
+CREATE INDEX `schedules_completed_when_lease` ON `schedules` (`completed`, `when`, `lease_expires`);
@@ -0,0 +1,38 @@
+/* Change tracking so a warm process can refresh its cached schedules with
+the rows changed since it last loaded, rather than loading everything */
+use `eventmagic`;
+
+ALTER TABLE `schedules`
+  ADD COLUMN `updated_at` TIMESTAMP(6) NOT NULL
+    DEFAULT CURRENT_TIMESTAMP(6);
+CREATE INDEX `schedules_updated_at` ON `schedules` (`updated_at`);
+
+/* Rather than ON UPDATE only changes to the stored fields count, as the lease
+changes on every claim. A trigger can not update its own table AFTER UPDATE
+so it sets the new row BEFORE */
+CREATE TRIGGER `schedules_updated` BEFORE UPDATE ON `schedules`
+  FOR EACH ROW SET NEW.`updated_at` = IF(
+    NEW.`when` <=> OLD.`when` AND NEW.`cron` <=> OLD.`cron`
+      AND NEW.`uuid` <=> OLD.`uuid` AND NEW.`completed` <=> OLD.`completed`,
+    OLD.`updated_at`, CURRENT_TIMESTAMP(6)
+  );
+
+ALTER TABLE `events`
+  ADD COLUMN `updated_at` TIMESTAMP(6) NOT NULL
+    DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6);
+CREATE INDEX `events_updated_at` ON `events` (`updated_at`);
+
+/* Jobs are looked up by event when an event changes */
+CREATE INDEX `jobs_event_id` ON `jobs` (`event_id`);
+
+/* Deleted schedules, so deletes are seen without counting every row.
+Rows can be pruned once every process has loaded past them */
+CREATE TABLE `deleted_schedules` (
+  `id` INT NOT NULL AUTO_INCREMENT,
+  PRIMARY KEY (id),
+  `schedule_id` INT NOT NULL,
+  `deleted_at` TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+);
+
+CREATE TRIGGER `schedules_deleted` AFTER DELETE ON `schedules`
+  FOR EACH ROW INSERT INTO `deleted_schedules` (`schedule_id`) VALUES (OLD.id);
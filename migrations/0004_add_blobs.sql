@@ -0,0 +1,11 @@
+/* Content addressed store for event functions and params, set
+eventmagic.BLOB_STORE = True to use it. Events reference a blob by the
+sha256 of its uncompressed bytes so identical values are stored once */
+use `eventmagic`;
+
+CREATE TABLE `blobs` (
+  `hash` CHAR(64) NOT NULL,
+  PRIMARY KEY (hash),
+  `compressed` BOOLEAN NOT NULL,
+  `data` LONGBLOB
+);
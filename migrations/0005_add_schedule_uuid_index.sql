@@ -0,0 +1,5 @@
+/* Index schedules by uuid, save() looks up the ids of new schedules by uuid.
+Run against a DB created with db_setup.sql */
+use `eventmagic`;
+
+CREATE INDEX `schedules_uuid` ON `schedules` (`uuid`);
@@ -35,17 +35,27 @@ i.e. AWS Lambda',
         # Pick your license as you wish
         'License :: OSI Approved :: MIT License',
 
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3.7',
     ],
 
     keywords='scheduling events lambda mysql',
 
+    # contextvars, asyncio.get_running_loop and datetime.fromisoformat
+    python_requires='>=3.7',
+
     packages=find_packages(exclude=['contrib', 'docs', 'tests', 'example.py']),
     install_requires=[
         'crontab==0.22.0',
         'mysql-connector-python==8.0.11'
     ],
 
+    entry_points={
+        'console_scripts': [
+            'eventmagic=eventmagic.runner:main',
+        ],
+    },
+
     extras_require={
         'dev': [
             'flake8',
@@ -58,6 +68,9 @@ i.e. AWS Lambda',
             'twine',
             'wheel'
         ],
+        'numpy': [
+            'numpy'
+        ],
     },
     project_urls={
         'Bug Reports': 'https://github.com/soimafreak/eventmagic/issues',
@@ -0,0 +1 @@
+"""Event Magic Tests."""
@@ -0,0 +1,27 @@
+"""Shared test helpers and fixtures."""
+
+import pytest
+import eventmagic
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def schedule_at(when):
+    """Return a new schedule with one job due at when."""
+    schedule = Schedule()
+    schedule.jobs = [Event(job)]
+    schedule.when = when
+    return schedule
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """Return a backend on an empty SQLite file."""
+    backend = eventmagic.SQLiteBackend(str(tmp_path / "eventmagic.db"))
+    yield backend
+    backend.close()
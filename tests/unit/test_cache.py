@@ -0,0 +1,78 @@
+"""ResultCache tests."""
+
+import asyncio
+import datetime
+from eventmagic.cache import ResultCache, ScheduleCache
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+
+done = list()
+
+
+def job():
+    """Record that the job ran."""
+    done.append(True)
+    return True
+
+
+def is_done():
+    """Return True once the job has run."""
+    return bool(done)
+
+
+def test_complete_after_execute_is_not_cached():
+    """The complete test after the execute sees what the execute changed."""
+    done.clear()
+    cache = ResultCache()
+    event = Event(job, complete_function=is_done)
+    event.execute(result_cache=cache)
+    assert event.completed
+    assert cache.get(is_done, event.complete_params) is True
+
+
+def test_complete_after_execute_async_is_not_cached():
+    """The async complete test after the execute is not cached either."""
+    done.clear()
+    cache = ResultCache()
+    event = Event(job, complete_function=is_done)
+    asyncio.run(event.execute_async(result_cache=cache))
+    assert event.completed
+
+
+def cached_schedule(schedule_id):
+    """Return a schedule with one job as if loaded from the DB."""
+    schedule = Schedule(
+        id=schedule_id, when=datetime.datetime(2030, 1, 1, 0, schedule_id)
+    )
+    schedule.jobs = [Event(job, id=schedule_id * 10)]
+    return schedule
+
+
+def test_schedule_cache_finds_unsaved_changes():
+    """Schedules whose own or jobs' fields changed are found."""
+    cache = ScheduleCache()
+    schedules = [cached_schedule(i) for i in range(1, 6)]
+    cache.replace(schedules)
+    assert cache.unsaved() == []
+    schedules[1].jobs[0].executions = 1
+    schedules[3].when = datetime.datetime(2031, 1, 1)
+    # Not cached, so not reported
+    cached_schedule(9).jobs[0].executions = 1
+    assert cache.unsaved() == [2, 4]
+    schedules[1].jobs[0].mark_clean()
+    schedules[3].mark_clean()
+    assert cache.unsaved() == []
+
+
+def test_schedule_cache_keeps_id_order():
+    """Merged and discarded schedules keep the cache in id order."""
+    cache = ScheduleCache()
+    cache.replace([cached_schedule(i) for i in (2, 5)])
+    cache.merge([cached_schedule(i) for i in (7, 1, 5)])
+    cache.discard([2, 8])
+    assert [s.id for s in cache.schedules] == [1, 5, 7]
+    changed = cache.schedules[1]
+    changed.jobs[0].executions = 1
+    assert cache.unsaved() == [5]
+    cache.merge([cached_schedule(5)])
+    assert cache.unsaved() == []
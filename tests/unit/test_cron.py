@@ -0,0 +1,91 @@
+"""Cron tests."""
+
+import datetime
+import random
+import pytest
+from crontab import CronTab
+from eventmagic import cron
+
+RANGES = {
+    "second": (0, 59), "minute": (0, 59), "hour": (0, 23), "day": (1, 31),
+    "month": (1, 12), "weekday": (0, 7), "year": (2024, 2032),
+}
+NAMES = {
+    "month": ["jan", "feb", "mar", "jun", "dec"],
+    "weekday": ["sun", "mon", "wed", "fri", "sat"],
+}
+
+
+def random_field(rand, field):
+    """Return a random field, any, a value, list, range or step."""
+    low, high = RANGES[field]
+    kind = rand.choice(["*", "*", "value", "list", "range", "step"])
+    if kind == "*":
+        return "*"
+    elif kind == "value":
+        if field in NAMES and rand.random() < 0.3:
+            return rand.choice(NAMES[field])
+        return str(rand.randint(low, high))
+    elif kind == "list":
+        values = rand.sample(range(low, high + 1), rand.randint(2, 4))
+        return ",".join(str(value) for value in sorted(values))
+    start = rand.randint(low, high)
+    end = rand.randint(start, high)
+    # CronTab can not step over years
+    if kind == "range" or field == "year":
+        return "{}-{}".format(start, end)
+    return "{}-{}/{}".format(start, end, rand.randint(1, 10))
+
+
+def random_expression(rand):
+    """Return a random 5, 6 or 7 field crontab expression."""
+    fields = ["minute", "hour", "day", "month", "weekday"]
+    shape = rand.choice([5, 5, 6, 7])
+    if shape > 5:
+        fields.append("year")
+    if shape > 6:
+        fields.insert(0, "second")
+    return " ".join(random_field(rand, field) for field in fields)
+
+
+def expected(crontab, now):
+    """Return when CronTab.next() says a crontab next fires."""
+    delay = crontab.next(now=now, default_utc=False)
+    if delay is None:
+        return None
+    return now + datetime.timedelta(seconds=delay)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_next_fires_matches_crontab(seed):
+    """next_fires agrees with CronTab.next() for random expressions."""
+    rand = random.Random(seed)
+    expressions = [random_expression(rand) for _ in range(200)]
+    crontabs = [CronTab(expression) for expression in expressions]
+    for _ in range(3):
+        now = datetime.datetime(2024, 1, 1) + datetime.timedelta(
+            seconds=rand.randint(0, 6 * 365 * 86400),
+            microseconds=rand.randint(0, 999999)
+        )
+        fires = cron.next_fires(crontabs, now)
+        for expression, crontab, fire in zip(expressions, crontabs, fires):
+            assert fire == expected(crontab, now), (expression, now)
+
+
+def test_next_fires_uses_numpy(monkeypatch):
+    """With NumPy enough crontabs are worked out without next_fire()."""
+    if cron.numpy is None:
+        pytest.skip("NumPy is not installed")
+
+    def next_fire(crontab, now=None):
+        raise AssertionError("worked out one at a time")
+
+    monkeypatch.setattr(cron, "next_fire", next_fire)
+    crontabs = [
+        CronTab("{} {} * * *".format(minute, minute % 24))
+        for minute in range(cron.VECTOR_MIN_CRONTABS)
+    ]
+    now = datetime.datetime(2030, 1, 1, 12)
+    assert cron.next_fires(crontabs, now) == [
+        expected(crontab, now) for crontab in crontabs
+    ]
@@ -0,0 +1,44 @@
+"""Event tests."""
+
+import copy
+import pickle
+import pytest
+from eventmagic.event import EMPTY_KWARGS, EMPTY_PARAMS, Event, FrozenParams
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def test_empty_params_unpickle_shared():
+    """The shared empty params unpickle and copy as the same objects."""
+    params = pickle.loads(pickle.dumps(EMPTY_PARAMS))
+    assert params is EMPTY_PARAMS
+    assert params["kwargs"] is EMPTY_KWARGS
+    assert copy.deepcopy(EMPTY_PARAMS) is EMPTY_PARAMS
+
+
+def test_params_unpickle_with_values():
+    """Other frozen params keep their values when pickled or copied."""
+    params = FrozenParams(args=(1,), kwargs=FrozenParams(x=2))
+    for loaded in (
+        pickle.loads(pickle.dumps(params)), copy.copy(params),
+        copy.deepcopy(params)
+    ):
+        assert type(loaded) is FrozenParams
+        assert loaded == params
+        assert type(loaded["kwargs"]) is FrozenParams
+
+
+def test_empty_params_can_not_change():
+    """The shared empty params can not be changed in place."""
+    params = EMPTY_PARAMS
+    with pytest.raises(TypeError):
+        params |= {"args": (1,)}
+    with pytest.raises(TypeError):
+        EMPTY_PARAMS["args"] = (1,)
+    with pytest.raises(TypeError):
+        EMPTY_PARAMS.update(args=(1,))
+    assert EMPTY_PARAMS == {"args": (), "kwargs": {}}
+    assert Event(job).execute_params is EMPTY_PARAMS
@@ -0,0 +1,97 @@
+"""Metrics tests."""
+
+import datetime
+import socket
+import pytest
+import eventmagic
+from eventmagic import metrics
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+from eventmagic.scheduler import Scheduler
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def new_schedules(count):
+    """Return schedules with one job due in a minute."""
+    schedules = list()
+    for _ in range(count):
+        schedule = Schedule()
+        schedule.jobs = [Event(job)]
+        schedule.when = datetime.datetime.now() + datetime.timedelta(minutes=1)
+        schedules.append(schedule)
+    return schedules
+
+
+@pytest.fixture(autouse=True)
+def disabled():
+    """Leave metrics disabled after every test."""
+    yield
+    metrics.disable()
+
+
+@pytest.fixture
+def backend():
+    """Return a backend on an in-memory SQLite DB."""
+    backend = eventmagic.SQLiteBackend(":memory:")
+    yield backend
+    backend.close()
+
+
+def test_statsd_sends_to_socket():
+    """Timings and counts arrive as StatsD lines on a UDP socket."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(5)
+    sink = metrics.StatsDSink(port=server.getsockname()[1])
+    try:
+        metrics.enable(sink)
+        metrics.timing("tick", 0.0125, uuid="abc")
+        metrics.count("query", 3)
+        assert server.recv(1024) == b"eventmagic.tick:12.500|ms|#uuid:abc"
+        assert server.recv(1024) == b"eventmagic.query:3|c"
+    finally:
+        sink.close()
+        server.close()
+
+
+def test_memory_sink_counts_queries_per_function(backend):
+    """Queries are counted against the outermost persistence function."""
+    sink = metrics.MemorySink()
+    metrics.enable(sink)
+    assert backend.save(new_schedules(2))
+    saves = sink.count("query", function="save")
+    assert saves > 0
+    backend.load()
+    loads = sink.count("query", function="load")
+    assert loads > 0
+    # Called by load, so counted against it
+    assert sink.count("query", function="query_schedules") == 0
+    assert sink.histogram("persistence", function="load").count == 1
+    # Loading is a fixed number of queries however many schedules there are
+    assert backend.save(new_schedules(20))
+    assert sink.count("query", function="save") == saves * 2
+    backend.load()
+    assert sink.count("query", function="load") == loads * 2
+
+
+def test_nothing_recorded_while_disabled(backend):
+    """No measurement reaches a sink once it is disabled."""
+    recorded = list()
+    metrics.enable(metrics.CallbackSink(
+        lambda *measurement: recorded.append(measurement)
+    ))
+    metrics.disable()
+    schedules = new_schedules(3)
+    Scheduler(schedules).tick(
+        datetime.datetime.now() + datetime.timedelta(minutes=2)
+    )
+    assert all(s.jobs[0].executions == 1 for s in schedules)
+    assert backend.save(schedules)
+    backend.load()
+    with backend.connection() as conn:
+        assert not isinstance(conn, metrics._MeasuredConnection)
+    assert recorded == []
@@ -0,0 +1,82 @@
+"""run_due tests."""
+
+import collections
+import datetime
+import pytest
+import eventmagic
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+
+calls = collections.Counter()
+
+
+def job():
+    """Count the call."""
+    calls["job"] += 1
+    return True
+
+
+def not_boolean():
+    """Count the call and fail by not returning a boolean."""
+    calls["not_boolean"] += 1
+    return "done"
+
+
+class Context(object):
+    """A Lambda context whose remaining time is read from a list."""
+
+    def __init__(self, *seconds):
+        """Create the context."""
+        self.seconds = list(seconds)
+
+    def get_remaining_time_in_millis(self):
+        """Return the next remaining time, then the last one forever."""
+        if len(self.seconds) > 1:
+            return self.seconds.pop(0) * 1000
+        return self.seconds[0] * 1000
+
+
+def due(minutes_ago, function=job):
+    """Return a one off schedule that was due minutes ago."""
+    schedule = Schedule(when=datetime.datetime.now() - datetime.timedelta(
+        minutes=minutes_ago
+    ))
+    schedule.jobs = [Event(function, until_success=True)]
+    return schedule
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    """Forget the calls made by earlier tests."""
+    calls.clear()
+
+
+def test_stops_at_the_safety_margin(backend):
+    """Nothing runs when the time left is at or below the margin."""
+    assert backend.save([due(1), due(2)])
+    assert eventmagic.run_due(
+        Context(10), safety_margin=10, pool=backend
+    ) == []
+    assert calls["job"] == 0
+    assert len(backend.load_due()) == 2
+
+
+def test_stops_between_batches(backend):
+    """Batches stop once the time left reaches the margin."""
+    assert backend.save([due(minutes) for minutes in range(1, 6)])
+    executed = eventmagic.run_due(
+        Context(20, 10.5, 10), batch_size=2, safety_margin=10, pool=backend
+    )
+    assert len(executed) == 4
+    assert calls["job"] == 4
+    assert len(backend.load_due()) == 1
+
+
+def test_failed_schedule_is_not_loaded_again(backend):
+    """A schedule that fails and stays due runs once per invocation."""
+    failing = due(10, not_boolean)
+    assert backend.save([failing, due(5), due(1)])
+    executed = eventmagic.run_due(batch_size=1, pool=backend)
+    assert len(executed) == 3
+    assert calls == {"not_boolean": 1, "job": 2}
+    assert [s.uuid for s in backend.load_due()] == [failing.uuid]
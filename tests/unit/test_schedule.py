@@ -0,0 +1,45 @@
+"""Schedule tests."""
+
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule, shutdown_executors
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """A ThreadPoolExecutor counting how many are created."""
+
+    created = 0
+
+    def __init__(self, *args, **kwargs):
+        """Count and create the executor."""
+        type(self).created += 1
+        super().__init__(*args, **kwargs)
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def test_executor_class_is_shared():
+    """An executor class is created once for every schedule using it."""
+    now = datetime.datetime.now()
+    schedules = list()
+    for _ in range(5):
+        schedule = Schedule(executor=CountingExecutor, max_workers=2)
+        schedule.jobs = [
+            Event(job, until_success=True), Event(job, until_success=True)
+        ]
+        schedule.when = now + datetime.timedelta(minutes=1)
+        schedules.append(schedule)
+    try:
+        for schedule in schedules:
+            assert schedule.execute(now=now + datetime.timedelta(minutes=2))
+        assert CountingExecutor.created == 1
+        assert all(
+            event.executions == 1
+            for schedule in schedules for event in schedule.jobs
+        )
+    finally:
+        shutdown_executors()
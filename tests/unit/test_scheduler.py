@@ -0,0 +1,154 @@
+"""Scheduler and TimerWheel tests."""
+
+import datetime
+import random
+import pytest
+from eventmagic import exceptions
+from eventmagic.event import Event
+from eventmagic.schedule import Schedule
+from eventmagic.scheduler import Scheduler, TimerWheel
+
+# Far enough ahead that every when can be set, on the minute
+START = (
+    datetime.datetime.now() + datetime.timedelta(days=10)
+).replace(second=0, microsecond=0)
+
+
+def job():
+    """Do nothing."""
+    return True
+
+
+def not_boolean():
+    """Fail by not returning a boolean."""
+    return "done"
+
+
+def one_off(when, function=job):
+    """Return a schedule with one job firing once at when."""
+    schedule = Schedule()
+    schedule.jobs = [Event(function, until_success=True)]
+    schedule.when = when
+    return schedule
+
+
+@pytest.fixture(params=[Scheduler, TimerWheel])
+def scheduler_class(request):
+    """Return a Scheduler or a TimerWheel, a wheel starts at START."""
+    if request.param is TimerWheel:
+        def wheel(schedules=None, retry=60, now=START):
+            return TimerWheel(schedules, retry, now=now)
+        return wheel
+    return lambda schedules=None, retry=60, now=None: Scheduler(
+        schedules, retry
+    )
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_a_scan(scheduler_class, seed):
+    """Popping due schedules agrees with scanning every schedule.
+
+    The clock jumps by seconds up to whole days so hour and day buckets are
+    entered and split, while schedules are moved and removed in between.
+    """
+    rand = random.Random(seed)
+    schedules = [
+        one_off(START + datetime.timedelta(
+            seconds=rand.randint(1, 3 * 86400)
+        ))
+        for _ in range(300)
+    ]
+    scheduler = scheduler_class(schedules)
+    waiting = {schedule.uuid: schedule for schedule in schedules}
+    now = START
+    while waiting:
+        for schedule in rand.sample(
+            list(waiting.values()), min(3, len(waiting))
+        ):
+            action = rand.choice(["later", "earlier", "remove", None])
+            if action == "remove":
+                scheduler.remove(schedule.uuid)
+                del waiting[schedule.uuid]
+            elif action is not None:
+                schedule.when = max(
+                    now + datetime.timedelta(seconds=1),
+                    schedule.when + datetime.timedelta(
+                        seconds=rand.randint(1, 7200) * (
+                            1 if action == "later" else -1
+                        )
+                    )
+                )
+                # Moving a schedule earlier needs it adding again
+                if action == "earlier":
+                    scheduler.add(schedule)
+        assert scheduler.next_due() == min(
+            (s.when for s in waiting.values()), default=None
+        )
+        now += datetime.timedelta(seconds=rand.choice([
+            rand.randint(1, 59), rand.randint(60, 3600),
+            rand.randint(3600, 86400)
+        ]))
+        due = scheduler.pop_due(now)
+        expected = sorted(
+            (s for s in waiting.values() if s.when <= now),
+            key=lambda s: s.when
+        )
+        assert [s.when for s in due] == [s.when for s in expected]
+        assert {s.uuid for s in due} == {s.uuid for s in expected}
+        for schedule in due:
+            del waiting[schedule.uuid]
+        assert len(scheduler) == len(waiting)
+    assert scheduler.next_due() is None
+
+
+def test_remove(scheduler_class):
+    """A removed schedule never fires and removing it again raises."""
+    first = one_off(START + datetime.timedelta(minutes=1))
+    second = one_off(START + datetime.timedelta(minutes=2))
+    scheduler = scheduler_class([first, second])
+    scheduler.remove(first.uuid)
+    assert first.uuid not in scheduler
+    assert scheduler.next_due() == second.when
+    with pytest.raises(exceptions.NoSchedulesProvided):
+        scheduler.remove(first.uuid)
+    assert scheduler.pop_due(START + datetime.timedelta(days=1)) == [second]
+
+
+def test_tick_executes_and_reschedules(scheduler_class):
+    """A due schedule runs and is added back at its next fire."""
+    schedule = Schedule()
+    schedule.jobs = [Event(job)]
+    schedule.when = "0 * * * *"
+    scheduler = scheduler_class([schedule], now=schedule.when)
+    now = schedule.when + datetime.timedelta(seconds=30)
+    assert scheduler.tick(now) == [schedule]
+    assert schedule.jobs[0].executions == 1
+    assert schedule.when == now.replace(minute=0, second=0) + \
+        datetime.timedelta(hours=1)
+    assert scheduler.next_due() == schedule.when
+    assert scheduler.tick(now + datetime.timedelta(minutes=1)) == []
+
+
+def test_tick_retries_a_failed_schedule(scheduler_class):
+    """A schedule still due after a failed job is retried after retry."""
+    when = START + datetime.timedelta(minutes=1)
+    failing = one_off(when, not_boolean)
+    scheduler = scheduler_class([failing], retry=90)
+    now = when + datetime.timedelta(seconds=5)
+    assert scheduler.tick(now) == [failing]
+    assert failing.when == when
+    assert scheduler.next_due() == now + datetime.timedelta(seconds=90)
+    assert scheduler.tick(now + datetime.timedelta(seconds=60)) == []
+    assert scheduler.tick(now + datetime.timedelta(seconds=90)) == [failing]
+
+
+def test_tick_drops_a_schedule_that_raises(scheduler_class):
+    """A schedule that raises is not added back."""
+    schedule = Schedule()
+    schedule.jobs = [Event(job)]
+    schedule.when = START + datetime.timedelta(minutes=1)
+    scheduler = scheduler_class([schedule])
+    # Not completed and no crontab, so it can not be rescheduled
+    assert scheduler.tick(schedule.when) == [schedule]
+    assert len(scheduler) == 0
+    assert scheduler.next_due() is None
@@ -0,0 +1,38 @@
+"""ScheduleSet tests."""
+
+import datetime
+from eventmagic.scheduleset import ScheduleSet
+from ..conftest import schedule_at
+
+WHEN = datetime.datetime(2030, 1, 1)
+
+
+def test_save_indexes_by_id(backend):
+    """Schedules saved through the set are indexed by their new ids."""
+    schedules = ScheduleSet([schedule_at(WHEN), schedule_at(WHEN)])
+    assert backend.save(schedules)
+    assert not schedules._unsaved
+    for schedule in schedules:
+        assert schedules.get_by_id(schedule.id) is schedule
+
+
+def test_get_by_id_indexes_other_saves(backend):
+    """Schedules saved as a list are found by id once looked up."""
+    schedule = schedule_at(WHEN)
+    schedules = ScheduleSet([schedule])
+    assert backend.save([schedule])
+    assert schedules.get_by_id(schedule.id) is schedule
+    assert schedules.get_by_id(schedule.id + 1) is None
+
+
+def test_discard_by_id(backend):
+    """Schedules are removed by id and unknown ids are ignored."""
+    first = schedule_at(WHEN)
+    second = schedule_at(WHEN)
+    schedules = ScheduleSet([first, second])
+    assert backend.save(schedules)
+    assert schedules.discard_by_id(first.id, 999) == [first]
+    assert first.uuid not in schedules
+    assert schedules.get_by_id(first.id) is None
+    assert list(schedules) == [second]
+    assert len(backend.load()) == 2
@@ -0,0 +1,158 @@
+"""SQLite backend tests."""
+
+import datetime
+import logging
+import eventmagic
+from ..conftest import schedule_at
+
+
+def test_save_and_load(backend):
+    """Saved schedules load back with their jobs."""
+    when = datetime.datetime(2030, 1, 1, 12, 30)
+    schedule = schedule_at(when)
+    assert backend.save([schedule])
+    assert schedule.id and schedule.jobs[0].id
+    loaded = backend.load()
+    assert [s.uuid for s in loaded] == [schedule.uuid]
+    assert loaded[0].when == when
+    assert loaded[0].jobs[0].uuid == schedule.jobs[0].uuid
+
+
+def test_save_writes_changes(backend):
+    """Saving a loaded schedule writes only its changes."""
+    assert backend.save([schedule_at(datetime.datetime(2030, 1, 1))])
+    schedule = backend.load()[0]
+    schedule.when = datetime.datetime(2031, 1, 1)
+    assert schedule.dirty == {"when"}
+    assert backend.save([schedule])
+    assert not schedule.dirty
+    assert backend.load()[0].when == datetime.datetime(2031, 1, 1)
+
+
+def test_save_does_not_restore_deleted(backend):
+    """A schedule deleted since it was loaded stays deleted."""
+    assert backend.save([schedule_at(datetime.datetime(2030, 1, 1))])
+    loaded = backend.load()
+    schedule = loaded[0]
+    backend.remove(backend.load(), schedule.uuid)
+    schedule.when = datetime.datetime(2031, 1, 1)
+    assert backend.save([schedule])
+    assert backend.load() == []
+
+
+def test_load_due(backend):
+    """Only schedules due by now are loaded, oldest first."""
+    now = datetime.datetime(2030, 1, 1)
+    late = schedule_at(now - datetime.timedelta(minutes=1))
+    later = schedule_at(now - datetime.timedelta(minutes=5))
+    assert backend.save([late, later, schedule_at(now + datetime.timedelta(
+        minutes=1
+    ))])
+    due = backend.load_due(now=now)
+    assert [s.uuid for s in due] == [later.uuid, late.uuid]
+
+
+def test_claim_leases_once(backend):
+    """A claimed schedule is not claimed again until it is released."""
+    now = datetime.datetime(2030, 1, 1)
+    schedule = schedule_at(now)
+    assert backend.save([schedule])
+    claimed = backend.claim(worker="one", now=now)
+    assert [s.uuid for s in claimed] == [schedule.uuid]
+    assert backend.claim(worker="two", now=now) == []
+    assert backend.release(claimed, worker="one")
+    assert len(backend.claim(worker="two", now=now)) == 1
+
+
+def test_load_cached(backend):
+    """A cached load picks up changed and deleted schedules."""
+    first = schedule_at(datetime.datetime(2030, 1, 1))
+    second = schedule_at(datetime.datetime(2030, 1, 1))
+    assert backend.save([first, second])
+    assert len(backend.load(cache=True)) == 2
+    first.when = datetime.datetime(2031, 1, 1)
+    assert backend.save([first])
+    backend.remove(backend.load(), second.uuid)
+    loaded = backend.load(cache=True)
+    assert [s.uuid for s in loaded] == [first.uuid]
+    assert loaded[0].when == datetime.datetime(2031, 1, 1)
+
+
+class CountingCursor(object):
+    """Wraps a cursor counting the statements run."""
+
+    def __init__(self, cursor):
+        """Wrap the cursor."""
+        self.cursor = cursor
+        self.statements = 0
+
+    def execute(self, query, params=()):
+        """Count and run one statement."""
+        self.statements += 1
+        self.cursor.execute(query, params)
+
+    def executemany(self, query, rows):
+        """Count and run a statement once per row."""
+        rows = list(rows)
+        self.statements += len(rows)
+        self.cursor.executemany(query, rows)
+
+
+def test_update_is_one_statement_per_batch(backend, monkeypatch):
+    """Changed rows are written with one UPDATE per batch and columns."""
+    monkeypatch.setattr(eventmagic, "SAVE_BATCH_SIZE", 10)
+    assert backend.save([
+        schedule_at(datetime.datetime(2030, 1, 1)) for _ in range(25)
+    ])
+    schedules = backend.load()
+    for i, schedule in enumerate(schedules):
+        schedule.when = datetime.datetime(2031, 1, 1, 0, i)
+    schedules[0].jobs[0].executions = 3
+    with backend.connection() as conn:
+        cursor = CountingCursor(conn.cursor())
+        eventmagic.update_schedules(cursor, schedules)
+        conn.commit()
+    # 25 schedules in 3 batches and 1 event
+    assert cursor.statements == 4
+    loaded = backend.load()
+    assert [s.when.minute for s in loaded] == list(range(25))
+    assert loaded[0].jobs[0].executions == 3
+    assert loaded[1].jobs[0].executions == 0
+
+
+def count_blobs(backend):
+    """Return the number of stored blobs."""
+    with backend.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM `blobs`;")
+        return cursor.fetchone()[0]
+
+
+def test_delete_removes_unused_blobs(backend, monkeypatch):
+    """A blob is deleted with the last event that references it."""
+    monkeypatch.setattr(eventmagic, "BLOB_STORE", True)
+    params = {"args": ("x" * 1000,), "kwargs": {}}
+    first = schedule_at(datetime.datetime(2030, 1, 1))
+    first.jobs[0].execute_params = params
+    second = schedule_at(datetime.datetime(2030, 1, 1))
+    second.jobs[0].execute_params = params
+    assert backend.save([first, second])
+    stored = count_blobs(backend)
+    assert stored > 0
+    backend.remove(backend.load(), first.uuid)
+    assert count_blobs(backend) == stored
+    assert backend.load()[0].jobs[0].execute_params == params
+    backend.remove(backend.load(), second.uuid)
+    assert count_blobs(backend) == 0
+
+
+def test_iter_schedules_exact_pages(backend, caplog, monkeypatch):
+    """A last page that is exactly full stops without a warning."""
+    assert backend.save([
+        schedule_at(datetime.datetime(2030, 1, 1)) for _ in range(4)
+    ])
+    monkeypatch.setattr(eventmagic, "LOAD_BATCH_SIZE", 2)
+    with caplog.at_level(logging.WARNING, logger=eventmagic.logger.name):
+        pages = list(eventmagic.iter_schedules(pool=backend))
+    assert [len(page) for page in pages] == [2, 2]
+    assert not caplog.records